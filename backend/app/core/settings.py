@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'equipment_app.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,10 +95,31 @@ DATABASES = {
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': '3306'
+        'PORT': '3306',
+        # seconds to keep a connection open between requests, 0 closes
+        # it after every request
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # ping reused connections before the first query of a request
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'True'
+        ) == 'True',
     }
 }
 
+# Connection pool shared by the threads of a worker (needed under ASGI,
+# where persistent connections are not reused between requests).
+# Connections are returned to the pool at the end of each request
+if os.getenv('DB_POOL_ENABLED', 'False') == 'True':
+    DATABASES['default'].update({
+        'ENGINE': 'dj_db_conn_pool.backends.mysql',
+        'CONN_MAX_AGE': 0,
+        'POOL_OPTIONS': {
+            'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 10)),
+            'MAX_OVERFLOW': int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+            'RECYCLE': int(os.getenv('DB_POOL_RECYCLE', 3600)),
+        },
+    })
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -141,7 +163,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'equipment_app.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -154,12 +176,149 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# JSON encode/decode with orjson, output is identical to DRF's JSONRenderer
+ORJSON_ENABLED = os.getenv('ORJSON_ENABLED', 'True') == 'True'
+
+if ORJSON_ENABLED:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'equipment_app.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'equipment_app.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared between workers when REDIS_URL is set, per-process otherwise
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds to keep paginated list counts
+LIST_COUNT_CACHE_TIMEOUT = int(os.getenv('LIST_COUNT_CACHE_TIMEOUT', 30))
+# Seconds to keep serialized list pages
+LIST_CACHE_TIMEOUT = int(os.getenv('LIST_CACHE_TIMEOUT', 60))
+
+# Build equipment list responses from values_list() rows instead of
+# EquipmentSerializer, output is identical
+FAST_LIST_SERIALIZATION = os.getenv(
+    'FAST_LIST_SERIALIZATION', 'False'
+) == 'True'
+
+# Stats of a period are cached without expiry once the period ended this
+# many seconds ago, longer than a transaction stamping rows in it can run
+EQUIPMENT_STATS_CLOSE_DELAY = int(
+    os.getenv('EQUIPMENT_STATS_CLOSE_DELAY', 3600)
+)
+
+# Equipment search: use the ngram FULLTEXT index on MySQL.
+# Token size must match the server's ngram_token_size
+EQUIPMENT_SEARCH_FULLTEXT = os.getenv(
+    'EQUIPMENT_SEARCH_FULLTEXT', 'True'
+) == 'True'
+EQUIPMENT_SEARCH_NGRAM_TOKEN_SIZE = int(
+    os.getenv('EQUIPMENT_SEARCH_NGRAM_TOKEN_SIZE', 2)
+)
+
+# In-process Bloom filters of active serial numbers per equipment type,
+# used to skip uniqueness queries for serial numbers that can't exist
+SERIAL_NUMBER_INDEX_ENABLED = os.getenv(
+    'SERIAL_NUMBER_INDEX_ENABLED', 'True'
+) == 'True'
+SERIAL_NUMBER_INDEX_TTL = int(os.getenv('SERIAL_NUMBER_INDEX_TTL', 300))
+SERIAL_NUMBER_INDEX_ERROR_RATE = float(
+    os.getenv('SERIAL_NUMBER_INDEX_ERROR_RATE', 0.01)
+)
+
+# Streaming equipment import (/api/equipment/import/)
+EQUIPMENT_IMPORT_BATCH_SIZE = int(
+    os.getenv('EQUIPMENT_IMPORT_BATCH_SIZE', 1000)
+)
+EQUIPMENT_IMPORT_MAX_BATCH_SIZE = int(
+    os.getenv('EQUIPMENT_IMPORT_MAX_BATCH_SIZE', 10000)
+)
+
+# Background bulk create jobs (/api/equipment/jobs/), run by
+# `manage.py run_equipment_jobs` workers
+EQUIPMENT_JOB_CHUNK_SIZE = int(os.getenv('EQUIPMENT_JOB_CHUNK_SIZE', 1000))
+EQUIPMENT_JOB_MAX_SERIAL_NUMBERS = int(
+    os.getenv('EQUIPMENT_JOB_MAX_SERIAL_NUMBERS', 1_000_000)
+)
+# Seconds without a heartbeat (one per chunk) before a running job is
+# handed to another worker
+EQUIPMENT_JOB_STALE_TIMEOUT = int(
+    os.getenv('EQUIPMENT_JOB_STALE_TIMEOUT', 300)
+)
+# Seconds an idle worker waits before looking for new jobs
+EQUIPMENT_JOB_POLL_INTERVAL = float(
+    os.getenv('EQUIPMENT_JOB_POLL_INTERVAL', 1)
+)
+# Per-index errors returned by one job poll
+EQUIPMENT_JOB_ERRORS_PAGE_SIZE = int(
+    os.getenv('EQUIPMENT_JOB_ERRORS_PAGE_SIZE', 1000)
+)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
-    'UPDATE_LAST_LOGIN': True,
+    'UPDATE_LAST_LOGIN': os.getenv(
+        'JWT_UPDATE_LAST_LOGIN', 'True'
+    ) == 'True',
+    'TOKEN_OBTAIN_SERIALIZER': 'equipment_app.authentication.'
+                               'UserSnapshotTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'equipment_app.authentication.'
+                                'DenylistTokenRefreshSerializer',
+}
+
+# Request metrics: Server-Timing header on every response, Prometheus
+# text at /api/metrics for scrapers sending "Authorization: Bearer
+# <METRICS_TOKEN>" (endpoint is disabled without a token)
+REQUEST_METRICS_SERVER_TIMING = os.getenv(
+    'REQUEST_METRICS_SERVER_TIMING', 'True'
+) == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Seconds to cache users of tokens issued without the user snapshot claims
+JWT_USER_CACHE_TIMEOUT = int(os.getenv('JWT_USER_CACHE_TIMEOUT', 60))
+# Reject revoked tokens (logout, user deactivated or changed), kept in
+# the cache: set REDIS_URL so all workers share it
+JWT_DENYLIST_ENABLED = os.getenv('JWT_DENYLIST_ENABLED', 'True') == 'True'
+
+# Login/register throttling, DRF rates like "10/minute" (empty disables
+# a limit) counted in the cache. Without REDIS_URL every process counts
+# on its own (`manage.py check --deploy` warns about it)
+AUTH_THROTTLE_RATES = {
+    'login_ip': os.getenv('LOGIN_IP_THROTTLE_RATE', '30/minute'),
+    'login_username': os.getenv('LOGIN_USERNAME_THROTTLE_RATE', '10/minute'),
+    'register_ip': os.getenv('REGISTER_IP_THROTTLE_RATE', '10/hour'),
 }
+# At most this many password hashes (login, register, /api/token/) at
+# once per process, others wait up to PASSWORD_HASH_WAIT_TIMEOUT seconds
+# and get 503; 0 disables the limit. Keep it below GUNICORN_THREADS so
+# sign-in bursts leave threads for the API
+PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', 2))
+# Optional limit across all processes, needs REDIS_URL; 0 disables it
+PASSWORD_HASH_GLOBAL_CONCURRENCY = int(
+    os.getenv('PASSWORD_HASH_GLOBAL_CONCURRENCY', 0)
+)
+PASSWORD_HASH_WAIT_TIMEOUT = float(
+    os.getenv('PASSWORD_HASH_WAIT_TIMEOUT', 2)
+)
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Your Project API',
@@ -0,0 +1,239 @@
+"""
+End-to-end API benchmark scenarios: requests go through the real URL
+routes, middleware, authentication and database. Run with
+`manage.py api_benchmark` on data generated by `manage.py seed_equipment`.
+"""
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .benchmarks import _random_serial_number
+
+SCENARIOS = {}
+
+BENCH_TYPE_NAME = 'api-benchmark'
+BENCH_TYPE_MASK = 'XXXXXXXXXXXX'
+SEARCH_TERMS = ['rack', 'spare', 'uplink', 'AB', '12', '@']
+
+
+def scenario(name):
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+class BenchmarkContext:
+    """Client and data shared by the scenarios of one run"""
+
+    def __init__(self, seed=42, bulk_size=100):
+        # fix circular imports
+        from django.contrib.auth.models import User
+
+        from .models import Equipment, EquipmentType
+        from .services.user import generate_tokens_for_user
+
+        self.rng = random.Random(seed)
+        self.bulk_size = bulk_size
+        user, _ = User.objects.get_or_create(username='api-benchmark')
+        host = settings.ALLOWED_HOSTS[0].lstrip('.')
+        self.client = Client(
+            SERVER_NAME='localhost' if host in ('', '*') else host,
+            HTTP_AUTHORIZATION='Bearer '
+            + generate_tokens_for_user(user)['access_token']
+        )
+        self.bench_type, _ = EquipmentType.objects.get_or_create(
+            name=BENCH_TYPE_NAME,
+            defaults={'serial_number_mask': BENCH_TYPE_MASK}
+        )
+        self.type_names = list(
+            EquipmentType.objects.exclude(pk=self.bench_type.pk)
+            .values_list('name', flat=True)[:100]
+        )
+        self.sample_ids = self._sample_active_ids(Equipment)
+        # ids created by bulk_create, consumed by update and delete
+        self.created_ids = []
+
+    def _sample_active_ids(self, model, size=1000):
+        """Random active ids without ORDER BY RAND() over the table"""
+        from django.db.models import Max, Min
+
+        bounds = model.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            return []
+        candidates = {self.rng.randint(bounds['low'], bounds['high'])
+                      for _ in range(size * 2)}
+        return list(model.objects.active().filter(
+            pk__in=candidates
+        ).values_list('pk', flat=True)[:size]) or list(
+            model.objects.active().values_list('pk', flat=True)[:size]
+        )
+
+    def cleanup(self):
+        """Hard deletes equipment created by the run"""
+        from .models import Equipment
+        from .services.equipment import reconcile_active_equipment_counts
+
+        Equipment.objects.filter(equipment_type=self.bench_type).delete()
+        reconcile_active_equipment_counts()
+
+
+def _results_count(response):
+    data = response.json()
+    return len(data['results']) if isinstance(data, dict) else len(data)
+
+
+@scenario('list')
+def list_first_page(ctx):
+    response = ctx.client.get('/api/equipment/')
+    return response, _results_count(response)
+
+
+@scenario('list_deep_page')
+def list_deep_page(ctx):
+    page = ctx.rng.randint(100, 1000)
+    response = ctx.client.get(f'/api/equipment/?page={page}')
+    if response.status_code == 404:
+        # smaller dataset, go to the last page
+        response = ctx.client.get('/api/equipment/?page=last')
+    return response, _results_count(response)
+
+
+@scenario('list_cursor')
+def list_cursor(ctx):
+    url = getattr(ctx, 'next_cursor_url', None) \
+        or '/api/equipment/?pagination=cursor'
+    response = ctx.client.get(url)
+    ctx.next_cursor_url = response.json().get('next')
+    return response, _results_count(response)
+
+
+@scenario('search')
+def search(ctx):
+    term = ctx.rng.choice(SEARCH_TERMS)
+    response = ctx.client.get(f'/api/equipment/?search={term}')
+    return response, _results_count(response)
+
+
+@scenario('filter')
+def filter_by_type_and_serial(ctx):
+    name = ctx.rng.choice(ctx.type_names or [BENCH_TYPE_NAME])
+    response = ctx.client.get('/api/equipment/', {
+        'equipment_type__name__icontains': name,
+        'serial_number__contains': ctx.rng.choice('ABCXYZ0123'),
+    })
+    return response, _results_count(response)
+
+
+@scenario('retrieve')
+def retrieve(ctx):
+    pk = ctx.rng.choice(ctx.sample_ids or [0])
+    response = ctx.client.get(f'/api/equipment/{pk}/')
+    return response, 1
+
+
+@scenario('bulk_create')
+def bulk_create(ctx):
+    response = ctx.client.post('/api/equipment/', {
+        'equipment_type': ctx.bench_type.pk,
+        'serial_numbers': [
+            _random_serial_number(BENCH_TYPE_MASK)
+            for _ in range(ctx.bulk_size)
+        ],
+        'notes': 'api benchmark',
+    }, content_type='application/json')
+    if response.status_code == 201:
+        ctx.created_ids.extend(item['id'] for item in response.json())
+    return response, ctx.bulk_size
+
+
+@scenario('update')
+def update(ctx):
+    pk = ctx.rng.choice(ctx.created_ids or ctx.sample_ids or [0])
+    response = ctx.client.patch(
+        f'/api/equipment/{pk}/',
+        {'notes': f'updated {ctx.rng.random()}'},
+        content_type='application/json'
+    )
+    return response, 1
+
+
+@scenario('delete')
+def delete(ctx):
+    pk = ctx.created_ids.pop() if ctx.created_ids else 0
+    response = ctx.client.delete(f'/api/equipment/{pk}/')
+    return response, 1
+
+
+def _percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1,
+                round(percent / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def run_scenario(ctx, name, iterations, warmup=2, cold_cache=True):
+    """Runs scenario and summarizes latency, queries and throughput
+
+    :param BenchmarkContext ctx:
+    :param str name:
+    :param int iterations:
+    :param int warmup: untimed iterations
+    :param bool cold_cache: clear cache before each request so pages and
+        counts come from the database
+
+    Returns:
+        dict: summary
+    """
+    func = SCENARIOS[name]
+    for _ in range(warmup):
+        func(ctx)
+
+    latencies = []
+    queries = []
+    rows = 0
+    errors = 0
+    for _ in range(iterations):
+        if cold_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response, response_rows = func(ctx)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(captured.captured_queries))
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            rows += response_rows
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(_percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 95) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+        'queries_per_request': round(statistics.fmean(queries), 2),
+        'rows_per_s': round(rows / sum(latencies), 1),
+    }
+
+
+def database_info() -> dict:
+    from .models import Equipment  # fix circular import
+
+    if connection.vendor == 'mysql':
+        version = '.'.join(map(str, connection.mysql_version))
+    elif connection.vendor == 'sqlite':
+        version = connection.Database.sqlite_version
+    else:
+        version = None
+    return {
+        'vendor': connection.vendor,
+        'version': version,
+        'equipment_rows': Equipment.objects.count(),
+    }
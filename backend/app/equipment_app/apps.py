@@ -5,3 +5,6 @@ class EquipmentAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'equipment_app'
     label = 'equipment_app'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,172 @@
+"""
+Async read endpoints for equipment, served natively under ASGI
+(SERVER_MODE=asgi in entrypoint.sh).
+
+DRF views are sync: under ASGI Django runs them in one thread per worker,
+so every request still waits on the database in turn. These views await
+the async ORM instead and return the same JSON and conditional GET
+headers as the list/retrieve actions of EquipmentViewSet, reusing its
+pagination and ETags (list always uses the values fast path).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .filters import EquipmentFilter
+from .mixins import CachedListMixin, ConditionalRetrieveMixin, \
+    get_requested_fields
+from .models import Equipment
+from .pagination import OptionalCursorPagination
+from .renderers import ORJSONRenderer
+from .serializers import EquipmentSerializer, EquipmentValuesSerializer
+from .services.equipment_async import aget_active_equipment
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of APIView: authentication with the default
+    DRF authentication classes, JSON responses and DRF style errors.
+    Only authenticated users are allowed.
+    """
+    renderer = ORJSONRenderer()
+
+    def get_authenticators(self):
+        return [auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+
+    def authenticate(self, request):
+        """
+        Returns:
+            tuple: (user, auth) or (None, WWW-Authenticate header value)
+
+        Raises:
+            rest_framework.exceptions.AuthenticationFailed
+        """
+        authenticators = self.get_authenticators()
+        for authenticator in authenticators:
+            user_auth = authenticator.authenticate(request)
+            if user_auth is not None:
+                return user_auth
+        return None, (authenticators[0].authenticate_header(request)
+                      if authenticators else None)
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            # authenticators query the user table with the sync ORM
+            user, auth = await sync_to_async(self.authenticate)(request)
+            if user is None:
+                return self.error_response(
+                    exceptions.NotAuthenticated(), authenticate_header=auth
+                )
+            request.user, request.auth = user, auth
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404 as exc:
+            return self.error_response(exceptions.NotFound(*exc.args))
+        except exceptions.APIException as exc:
+            return self.error_response(exc)
+
+    def error_response(self, exc, authenticate_header=None):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) \
+            else {'detail': exc.detail}
+        response = self.render(data, status=exc.status_code)
+        if authenticate_header:
+            response['WWW-Authenticate'] = authenticate_header
+        return response
+
+    def render(self, data, status=200):
+        return HttpResponse(
+            self.renderer.render(data), status=status,
+            content_type=self.renderer.media_type
+        )
+
+
+class AsyncEquipmentListView(CachedListMixin, AsyncAPIView):
+    """
+    Async equipment list: same filters, ?fields=, pagination (page number
+    or ?pagination=cursor), ETag and cached pages as the sync list, cached
+    counts are shared with it.
+    """
+    basename = 'equipment'
+    pagination_class = OptionalCursorPagination
+    values_serializer_class = EquipmentValuesSerializer
+
+    def initialize_request(self, request):
+        drf_request = Request(request)
+        # only JSON is rendered, part of the ETag like for the sync list
+        drf_request.accepted_renderer = self.renderer
+        drf_request.accepted_media_type = self.renderer.media_type
+        return drf_request
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = self.initialize_request(request)
+        etag = await self.aget_list_etag(drf_request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = self.get_list_cache_key(etag)
+        data = await cache.aget(cache_key)
+        if data is None:
+            data = await self.alist(drf_request)
+            await cache.aset(cache_key, data, settings.LIST_CACHE_TIMEOUT)
+
+        response = self.render(data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    async def alist(self, request):
+        """Returns data of the paginated list response"""
+        query_params = request.query_params
+        filterset = EquipmentFilter(
+            query_params,
+            queryset=Equipment.objects.active().order_by('id', 'created_at')
+        )
+        if not filterset.is_valid():
+            raise exceptions.ValidationError(filterset.errors)
+        values_serializer = self.values_serializer_class(
+            fields=get_requested_fields(
+                query_params, self.values_serializer_class.values_fields
+            )
+        )
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(
+            values_serializer.get_values_queryset(filterset.qs),
+            request, self
+        )
+        return paginator.get_paginated_response(
+            values_serializer.to_representation(page)
+        ).data
+
+
+class AsyncEquipmentDetailView(ConditionalRetrieveMixin, AsyncAPIView):
+    """
+    Async equipment retrieve, with the ETag and Last-Modified of the sync
+    retrieve
+    """
+    etag_related_fields = ('equipment_type',)
+
+    async def get(self, request, pk, *args, **kwargs):
+        equipment = await aget_active_equipment(pk)
+        if equipment is None:
+            raise Http404('No Equipment matches the given query.')
+        etag = self.get_object_etag(equipment)
+        last_modified = self.get_last_modified(equipment)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = self.render(EquipmentSerializer(equipment).data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
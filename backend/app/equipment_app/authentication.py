@@ -0,0 +1,101 @@
+import calendar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, \
+    InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, \
+    TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .services.password_hashing import password_hashing_slot
+from .services.token_denylist import is_token_revoked
+
+# user fields copied into tokens, enough for IsAuthenticated/IsAdminUser
+USER_SNAPSHOT_CLAIMS = ('username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_cached_user_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+class UserSnapshotRefreshToken(RefreshToken):
+    """
+    Refresh token carrying a snapshot of the user, copied to access tokens.
+    Tokens are revoked when any snapshot field changes.
+
+    "iat" (copied to access tokens too) keeps fractions of a second, so a
+    token issued right after a revocation isn't taken for one issued
+    before it in the same second.
+    """
+
+    def set_iat(self, claim='iat', at_time=None):
+        if at_time is None:
+            at_time = self.current_time
+        self.payload[claim] = (calendar.timegm(at_time.utctimetuple())
+                               + at_time.microsecond / 1e6)
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_SNAPSHOT_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class UserSnapshotTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserSnapshotRefreshToken
+
+    def validate(self, attrs):
+        with password_hashing_slot():
+            return super().validate(attrs)
+
+
+class DenylistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = UserSnapshotRefreshToken
+
+    def validate(self, attrs):
+        if is_token_revoked(self.token_class(attrs['refresh'])):
+            raise InvalidToken('Token is revoked')
+        return super().validate(attrs)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a user query per request.
+
+    Tokens with the user snapshot claims authenticate as TokenUser built
+    from the claims. Older tokens fall back to the user row, cached for
+    JWT_USER_CACHE_TIMEOUT seconds. Revoked tokens are rejected.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_token_revoked(validated_token):
+            raise InvalidToken('Token is revoked')
+        return validated_token
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                'Token contained no recognizable user identification'
+            )
+
+        if all(claim in validated_token for claim in USER_SNAPSHOT_CLAIMS):
+            if (api_settings.CHECK_USER_IS_ACTIVE
+                    and not validated_token['is_active']):
+                raise AuthenticationFailed('User is inactive',
+                                           code='user_inactive')
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        key = get_cached_user_key(validated_token[api_settings.USER_ID_CLAIM])
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.JWT_USER_CACHE_TIMEOUT)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return user
@@ -0,0 +1,293 @@
+"""
+Micro-benchmarks for hot code paths. Run with `manage.py benchmark`.
+"""
+import random
+import re
+import string
+import timeit
+
+BENCHMARKS = {}
+
+
+def register(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def _best_of(func, number, repeat=3):
+    """Returns best time in seconds for `number` calls of func"""
+    return min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def _random_serial_number(mask):
+    alphabet = {
+        'N': string.digits,
+        'A': string.ascii_uppercase,
+        'a': string.ascii_lowercase,
+        'X': string.ascii_uppercase + string.digits,
+        'Z': '-_@',
+    }
+    return ''.join(random.choice(alphabet[char]) for char in mask)
+
+
+def _legacy_get_serial_numbers_errors(serial_number, serial_number_mask):
+    """Per-character re.match implementation, kept as a baseline"""
+    sn_len = len(serial_number)
+    mask_len = len(serial_number_mask)
+    if sn_len != mask_len:
+        return [
+            f"Serial number must be {mask_len} "
+            f"characters long, current length: {sn_len}"
+        ]
+
+    errors = []
+    char_patterns = {
+        'N': r'^[0-9]$',
+        'A': r'^[A-Z]$',
+        'a': r'^[a-z]$',
+        'X': r'^[A-Z0-9]$',
+        'Z': r'^[-_@]$'
+    }
+    error_messages = {
+        'N': "must be a digit (0-9)",
+        'A': "must be an uppercase letter",
+        'a': "must be a lowercase letter",
+        'X': "must be an uppercase letter or digit",
+        'Z': "must be one of: -, _, @"
+    }
+    for i, (char, mask_char) in enumerate(
+            zip(serial_number, serial_number_mask)
+    ):
+        if not re.match(char_patterns[mask_char], char):
+            errors.append(
+                f"Character at position {i + 1} "
+                f"{error_messages[mask_char]}"
+            )
+    return errors
+
+
+@register('serial_mask')
+def bench_serial_mask(size=10000):
+    """Compiled mask validator vs per-character re.match"""
+    from .services.equipment import _get_serial_numbers_errors
+
+    mask = 'XXAAAAAXAA'
+    serial_numbers = [_random_serial_number(mask) for _ in range(size)]
+
+    def legacy():
+        for serial_number in serial_numbers:
+            _legacy_get_serial_numbers_errors(serial_number, mask)
+
+    def compiled():
+        for serial_number in serial_numbers:
+            _get_serial_numbers_errors(serial_number, mask)
+
+    legacy_time = _best_of(legacy, number=1)
+    compiled_time = _best_of(compiled, number=1)
+    return {
+        'size': size,
+        'legacy_s': round(legacy_time, 4),
+        'compiled_s': round(compiled_time, 4),
+        'speedup': round(legacy_time / compiled_time, 1),
+    }
+
+
+def _legacy_find_duplicates(serial_numbers):
+    """Quadratic list.count implementation, kept as a baseline"""
+    return {x for x in serial_numbers if serial_numbers.count(x) > 1}
+
+
+@register('duplicates')
+def bench_duplicates(size=10000):
+    """Single-pass duplicate detection vs list.count"""
+    from .services.equipment import _get_duplicate_serial_numbers_errors
+
+    serial_numbers = [f'SN{i:08d}' for i in range(size)]
+    serial_numbers[-1] = serial_numbers[0]
+
+    linear_time = _best_of(
+        lambda: _get_duplicate_serial_numbers_errors(serial_numbers),
+        number=1
+    )
+    result = {'size': size, 'linear_s': round(linear_time, 4)}
+    # the quadratic baseline takes minutes past this size
+    if size <= 20000:
+        legacy_time = _best_of(
+            lambda: _legacy_find_duplicates(serial_numbers),
+            number=1, repeat=1
+        )
+        result['legacy_s'] = round(legacy_time, 4)
+        result['speedup'] = round(legacy_time / linear_time, 1)
+    return result
+
+
+def _legacy_search_q(value):
+    """Leading-wildcard LIKE over a join, kept as a baseline"""
+    from django.db.models import Q
+
+    return (Q(serial_number__contains=value)
+            | Q(notes__icontains=value)
+            | Q(equipment_type__name__icontains=value))
+
+
+@register('search')
+def bench_search(size=100000):
+    """Equipment search filter vs LIKE over join (seeds `size` rows)"""
+    from django.db import transaction
+
+    from .models import Equipment, EquipmentType
+    from .search import equipment_search_q
+
+    masks = ['XXAAAAAXAA', 'NNNNNNNNNN', 'AAAANNNNZa']
+    words = ['rack', 'spare', 'broken', 'warehouse', 'office', 'lab']
+    with transaction.atomic():
+        equipment_types = [
+            EquipmentType.objects.create(
+                name=f'bench-search-{i}-{mask}', serial_number_mask=mask
+            )
+            for i, mask in enumerate(masks)
+        ]
+        for start in range(0, size, 10000):
+            Equipment.objects.bulk_create(
+                Equipment(
+                    equipment_type=equipment_types[i % len(masks)],
+                    serial_number=_random_serial_number(
+                        masks[i % len(masks)]
+                    ),
+                    notes=' '.join(random.sample(words, 2)),
+                )
+                for i in range(start, min(start + 10000, size))
+            )
+
+    results = {'size': size}
+    try:
+        queryset = Equipment.objects.active().filter(
+            equipment_type__in=equipment_types
+        ).order_by('id')
+        for term in ['AB', '1234', 'spare', 'bench-search-1', '@']:
+            legacy = queryset.filter(_legacy_search_q(term))
+            indexed = queryset.filter(equipment_search_q(term))
+            if (list(legacy.values_list('id', flat=True)[:100])
+                    != list(indexed.values_list('id', flat=True)[:100])):
+                raise AssertionError(f'Search results differ for {term!r}')
+
+            def run(qs):
+                return lambda: (qs.count(), list(qs[:10]))
+
+            legacy_time = _best_of(run(legacy), number=1)
+            indexed_time = _best_of(run(indexed), number=1)
+            results[term] = {
+                'legacy_s': round(legacy_time, 4),
+                'indexed_s': round(indexed_time, 4),
+                'speedup': round(legacy_time / indexed_time, 1),
+            }
+    finally:
+        EquipmentType.objects.filter(
+            pk__in=[equipment_type.pk for equipment_type in equipment_types]
+        ).delete()
+    return results
+
+
+@register('list_serialization')
+def bench_list_serialization(size=100):
+    """EquipmentValuesSerializer vs EquipmentSerializer for one list page
+    of `size` rows, JSON rendering included (seeds `size` rows)"""
+    from rest_framework.renderers import JSONRenderer
+
+    from .models import Equipment, EquipmentType
+    from .serializers import EquipmentSerializer, EquipmentValuesSerializer
+
+    mask = 'XXAAAAAXAA'
+    equipment_type = EquipmentType.objects.create(
+        name=f'bench-list-{size}', serial_number_mask=mask
+    )
+    try:
+        Equipment.objects.bulk_create(
+            Equipment(
+                equipment_type=equipment_type,
+                serial_number=_random_serial_number(mask),
+                notes='bench',
+            )
+            for _ in range(size)
+        )
+        queryset = Equipment.objects.active().select_related(
+            'equipment_type'
+        ).filter(equipment_type=equipment_type).order_by('id')
+        renderer = JSONRenderer()
+        values_serializer = EquipmentValuesSerializer()
+
+        def model_serializer():
+            return renderer.render(
+                EquipmentSerializer(list(queryset), many=True).data
+            )
+
+        def fast():
+            return renderer.render(values_serializer.to_representation(
+                list(values_serializer.get_values_queryset(queryset))
+            ))
+
+        if model_serializer() != fast():
+            raise AssertionError('List serialization output differs')
+
+        serializer_time = _best_of(model_serializer, number=5)
+        fast_time = _best_of(fast, number=5)
+    finally:
+        equipment_type.delete()
+    return {
+        'size': size,
+        'serializer_ms': round(serializer_time / 5 * 1000, 3),
+        'values_ms': round(fast_time / 5 * 1000, 3),
+        'speedup': round(serializer_time / fast_time, 1),
+    }
+
+
+@register('json')
+def bench_json(size=10000):
+    """ORJSONParser/ORJSONRenderer vs DRF JSONParser/JSONRenderer:
+    bulk create body with `size` serial numbers and a 100-item page"""
+    import io
+    from datetime import timedelta
+
+    from django.utils import timezone
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from .parsers import ORJSONParser
+    from .renderers import ORJSONRenderer
+
+    mask = 'XXAAAAAXAA'
+    body = JSONRenderer().render({
+        'equipment_type': 1,
+        'serial_numbers': [_random_serial_number(mask) for _ in range(size)],
+        'notes': 'bench',
+    })
+    now = timezone.now()
+    page = {
+        'count': 100000,
+        'next': 'http://testserver/api/equipment/?page=2',
+        'previous': None,
+        'results': [{
+            'id': i,
+            'equipment_type': 1,
+            'equipment_type_name': 'Switch',
+            'serial_number': _random_serial_number(mask),
+            'notes': 'bench',
+            'created_at': now - timedelta(seconds=i),
+            'updated_at': now,
+        } for i in range(100)],
+    }
+
+    results = {'size': size, 'body_bytes': len(body)}
+    for name, parse, render in [
+        ('stdlib', JSONParser().parse, JSONRenderer().render),
+        ('orjson', ORJSONParser().parse, ORJSONRenderer().render),
+    ]:
+        parse_time = _best_of(lambda: parse(io.BytesIO(body)), number=10)
+        render_time = _best_of(lambda: render(page), number=100)
+        results[name] = {
+            'parse_mb_s': round(len(body) * 10 / parse_time / 1e6, 1),
+            'render_page_ms': round(render_time / 100 * 1000, 4),
+        }
+    return results
@@ -0,0 +1,76 @@
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F
+
+EQUIPMENT_VERSION = 'equipment'
+EQUIPMENT_STATS_VERSION = 'equipment_stats'
+
+
+def is_shared_cache(alias='default') -> bool:
+    """True when processes see each other's cache entries (Redis,
+    database or file cache), not for the per-process LocMemCache"""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def _versions():
+    from .models import DataVersion  # fix circular import
+
+    return DataVersion.objects
+
+
+def _get_version(name):
+    versions = list(_versions().filter(pk=name).values_list(
+        'version', flat=True
+    ))
+    return versions[0] if versions else 0
+
+
+def _bump_version(name):
+    if not _versions().filter(pk=name).update(version=F('version') + 1):
+        # start from a fresh value so keys cached before the row existed
+        # (e.g. for a previous database) never match
+        _versions().get_or_create(pk=name,
+                                  defaults={'version': time.time_ns()})
+
+
+def get_equipment_version():
+    """
+    Returns current version of equipment data. Cache keys derived from
+    equipment data include it, so bumping the version invalidates them.
+    One primary key lookup, the version lives in the database so that
+    writes of other processes are seen right away.
+    """
+    return _get_version(EQUIPMENT_VERSION)
+
+
+async def aget_equipment_version():
+    """Async variant of get_equipment_version"""
+    versions = [version async for version in _versions().filter(
+        pk=EQUIPMENT_VERSION
+    ).values_list('version', flat=True)]
+    return versions[0] if versions else 0
+
+
+def invalidate_equipment_caches():
+    """Invalidates equipment caches once the current transaction commits.
+    The version row is updated in its own short statement after the
+    commit, so concurrent writers don't queue on its lock."""
+    transaction.on_commit(lambda: _bump_version(EQUIPMENT_VERSION))
+
+
+def get_equipment_stats_version():
+    """
+    Returns version of cached equipment stats. Stats of closed periods
+    only change when equipment is hard deleted, e.g. with its type, or
+    moved to another type.
+    """
+    return _get_version(EQUIPMENT_STATS_VERSION)
+
+
+def invalidate_equipment_stats():
+    """Drops cached stats of closed periods once the transaction commits"""
+    transaction.on_commit(lambda: _bump_version(EQUIPMENT_STATS_VERSION))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .cache import is_shared_cache
+
+
+@register(Tags.caches)
+def check_password_hashing_cache(app_configs, **kwargs):
+    if settings.PASSWORD_HASH_GLOBAL_CONCURRENCY > 0 \
+            and not is_shared_cache():
+        return [Error(
+            'PASSWORD_HASH_GLOBAL_CONCURRENCY needs a cache shared by all '
+            'processes, the default cache is per-process.',
+            hint='Set REDIS_URL or PASSWORD_HASH_GLOBAL_CONCURRENCY=0.',
+            id='equipment_app.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared_cache():
+        return []
+    return [Warning(
+        'The default cache is per-process: login/register throttles, the '
+        'token denylist and cached users are not shared between workers.',
+        hint='Set REDIS_URL.',
+        id='equipment_app.W001',
+    )]
@@ -0,0 +1,52 @@
+import os
+import threading
+
+from django.conf import settings
+
+
+class ConnectionStats:
+    """
+    Per-process counters of requests and database connections opened
+    for them. With persistent connections most requests reuse the
+    connection of their thread, so `reuse_ratio` should stay close to 1;
+    a low ratio means every request pays the TCP and auth handshake.
+
+    In pooled mode a "connection" is a checkout from the pool, physical
+    connections are reused by the pool itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+
+    def request_started(self):
+        with self._lock:
+            self.requests += 1
+
+    def connection_created(self):
+        with self._lock:
+            self.connections += 1
+
+    def stats(self) -> dict:
+        database = settings.DATABASES['default']
+        requests, connections = self.requests, self.connections
+        return {
+            'pid': os.getpid(),
+            'requests': requests,
+            'connections': connections,
+            'reuse_ratio': (
+                round(max(requests - connections, 0) / requests, 4)
+                if requests else None
+            ),
+            'conn_max_age': database.get('CONN_MAX_AGE', 0),
+            'conn_health_checks': database.get('CONN_HEALTH_CHECKS', False),
+            'pool': database.get('POOL_OPTIONS'),
+        }
+
+
+connection_stats = ConnectionStats()
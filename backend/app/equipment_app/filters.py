@@ -1,7 +1,7 @@
 import django_filters
-from django.db.models import Q
 
 from .models import Equipment, EquipmentType
+from .search import equipment_search_q
 
 
 class EquipmentTypeFilter(django_filters.FilterSet):
@@ -32,10 +32,7 @@ class EquipmentFilter(django_filters.FilterSet):
     )
 
     def filter_search(self, queryset, name, value):
-        q_serial = Q(serial_number__contains=value)
-        q_notes = Q(notes__icontains=value)
-        q_type = Q(equipment_type__name__icontains=value)
-        return queryset.filter(q_serial | q_notes | q_type)
+        return queryset.filter(equipment_search_q(value))
 
     class Meta:
         model = Equipment
@@ -0,0 +1,60 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment_app.api_benchmarks import SCENARIOS, BenchmarkContext, \
+    database_info, run_scenario
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs API scenarios through the real URL routes and writes p50/p95 '
+        'latency, queries per request and rows/s to a JSON file. Seed data '
+        'first with `manage.py seed_equipment`'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help=f'Scenarios to run, all by default: '
+                 f'{", ".join(SCENARIOS)}'
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--bulk-size', type=int, default=100,
+                            help='Serial numbers per bulk create request')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="Don't clear the cache between requests")
+        parser.add_argument('--output', default='api_benchmark.json',
+                            help='Results file')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(unknown)}')
+        ctx = BenchmarkContext(seed=options['seed'],
+                               bulk_size=options['bulk_size'])
+        results = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'database': database_info(),
+            'iterations': options['iterations'],
+            'cache': 'warm' if options['warm_cache'] else 'cold',
+            'scenarios': {},
+        }
+        try:
+            for name in options['names'] or list(SCENARIOS):
+                summary = run_scenario(
+                    ctx, name, options['iterations'],
+                    cold_cache=not options['warm_cache']
+                )
+                results['scenarios'][name] = summary
+                self.stdout.write(f'{name}: {json.dumps(summary)}')
+        finally:
+            ctx.cleanup()
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Results written to {options["output"]}'
+        ))
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment_app.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = 'Runs micro-benchmarks for hot code paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help=f'Benchmarks to run, all by default: '
+                 f'{", ".join(BENCHMARKS)}'
+        )
+        parser.add_argument(
+            '--size', type=int, action='append', dest='sizes',
+            help='Input size, can be passed several times'
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f'Unknown benchmarks: {", ".join(unknown)}')
+        names = options['names'] or sorted(BENCHMARKS)
+        for name in names:
+            benchmark = BENCHMARKS[name]
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(f'{name}: {benchmark.__doc__}')
+            )
+            for size in options['sizes'] or [None]:
+                kwargs = {} if size is None else {'size': size}
+                self.stdout.write(json.dumps(benchmark(**kwargs)))
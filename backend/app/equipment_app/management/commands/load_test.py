@@ -0,0 +1,96 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures concurrent-request throughput of running API endpoints. '
+        'Compare e.g. /api/equipment/ on the default gunicorn (WSGI) '
+        'deployment with /api/async/equipment/ on SERVER_MODE=asgi'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Endpoints to request')
+        parser.add_argument('--requests', type=int, default=1000,
+                            help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, action='append',
+                            dest='concurrency_levels',
+                            help='Concurrent clients, can be passed '
+                                 'several times (default 50)')
+        parser.add_argument('--token', help='JWT access token')
+        parser.add_argument('--username',
+                            help='Obtain a token from /api/token/ instead')
+        parser.add_argument('--password')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def get_token(self, url, username, password, timeout):
+        token_url = url.split('/api/', 1)[0] + '/api/token/'
+        request = urllib.request.Request(
+            token_url,
+            data=json.dumps({'username': username,
+                             'password': password}).encode(),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.load(response)['access']
+        except (urllib.error.URLError, KeyError, ValueError) as e:
+            raise CommandError(f'Could not obtain token: {e}')
+
+    def request(self, url, headers, timeout):
+        """Returns latency in seconds, None on error"""
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(
+                    urllib.request.Request(url, headers=headers),
+                    timeout=timeout
+            ) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            return None
+        return time.perf_counter() - started
+
+    def run(self, url, headers, total, concurrency, timeout):
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            latencies = list(executor.map(
+                lambda _: self.request(url, headers, timeout), range(total)
+            ))
+            elapsed = time.perf_counter() - started
+
+        ok = sorted(latency for latency in latencies if latency is not None)
+        result = {
+            'url': url,
+            'concurrency': concurrency,
+            'requests': total,
+            'errors': total - len(ok),
+            'requests_per_s': round(len(ok) / elapsed, 1),
+        }
+        if len(ok) >= 2:
+            quantiles = statistics.quantiles(ok, n=100)
+            result.update({
+                'p50_ms': round(quantiles[49] * 1000, 1),
+                'p95_ms': round(quantiles[94] * 1000, 1),
+                'p99_ms': round(quantiles[98] * 1000, 1),
+            })
+        return result
+
+    def handle(self, *args, **options):
+        token = options['token']
+        if token is None and options['username']:
+            token = self.get_token(options['urls'][0], options['username'],
+                                   options['password'], options['timeout'])
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+        for concurrency in options['concurrency_levels'] or [50]:
+            for url in options['urls']:
+                self.stdout.write(json.dumps(self.run(
+                    url, headers, options['requests'], concurrency,
+                    options['timeout']
+                )))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from equipment_app.services.equipment import \
+    reconcile_active_equipment_counts
+
+
+class Command(BaseCommand):
+    help = 'Recomputes stored active equipment counts of equipment types'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report types with wrong counts'
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile_active_equipment_counts(
+            dry_run=options['dry_run']
+        )
+        for type_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(
+                f'Equipment type {type_id}: stored {stored}, actual {actual}'
+            )
+        action = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {len(drift)} equipment type(s) with drift'
+        ))
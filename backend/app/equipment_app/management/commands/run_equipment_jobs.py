@@ -0,0 +1,69 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from equipment_app.services.equipment_jobs import claim_next_job, \
+    get_worker_id, process_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued bulk create jobs (/api/equipment/jobs/) chunk by '
+        'chunk. Start several workers for a pool, they share the queue '
+        'table and never take the same job. SIGTERM/SIGINT stop the '
+        'worker after the current chunk, the job is picked up again by '
+        'another worker'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty')
+        parser.add_argument('--chunk-size', type=int,
+                            default=settings.EQUIPMENT_JOB_CHUNK_SIZE,
+                            help='Serial numbers created per transaction')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.EQUIPMENT_JOB_POLL_INTERVAL,
+                            help='Seconds to wait for new jobs when idle')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                previous_handlers[signum] = signal.signal(
+                    signum, lambda *_: stop.set()
+                )
+        try:
+            self.run(stop, options)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    def run(self, stop, options):
+        worker_id = get_worker_id()
+        self.stdout.write(f'Worker {worker_id} started')
+        while not stop.is_set():
+            # long running process: drop connections past CONN_MAX_AGE
+            # or broken ones between jobs, unless called inside a
+            # transaction (tests)
+            if not connection.in_atomic_block:
+                close_old_connections()
+            job = claim_next_job(worker_id)
+            if job is None:
+                if options['once']:
+                    break
+                stop.wait(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Job {job.pk}: {job.total} serial numbers')
+            try:
+                status = process_job(job, worker_id, options['chunk_size'],
+                                     should_stop=stop.is_set)
+            except Exception as e:
+                self.stderr.write(f'Job {job.pk} failed: {e!r}')
+                continue
+            self.stdout.write(f'Job {job.pk}: {status}')
+        self.stdout.write(f'Worker {worker_id} stopped')
@@ -0,0 +1,161 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from equipment_app.cache import invalidate_equipment_caches
+from equipment_app.models import Equipment, EquipmentType
+from equipment_app.services.equipment import \
+    reconcile_active_equipment_counts
+from equipment_app.services.serial_mask import MASK_CHAR_PATTERNS
+
+SEED_TYPE_PREFIX = 'seed-'
+
+MASK_ALPHABETS = {
+    'N': '0123456789',
+    'A': 'ABCDEFGHIJKLMNOPQRSTUVWXYZ',
+    'a': 'abcdefghijklmnopqrstuvwxyz',
+    'X': 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    'Z': '-_@',
+}
+
+NOTES_WORDS = ['rack', 'spare', 'broken', 'warehouse', 'office', 'lab',
+               'floor', 'backup', 'core', 'edge', 'uplink', 'test']
+
+
+def random_mask(rng, min_capacity):
+    """Returns random mask with room for at least min_capacity serials"""
+    chars = sorted(MASK_CHAR_PATTERNS)
+    while True:
+        mask = ''.join(
+            rng.choice(chars) for _ in range(rng.randint(8, 12))
+        )
+        if mask_capacity(mask) >= min_capacity:
+            return mask
+
+
+def mask_capacity(mask):
+    capacity = 1
+    for char in mask:
+        capacity *= len(MASK_ALPHABETS[char])
+    return capacity
+
+
+def serial_number_for(mask, number):
+    """Maps number (< mask capacity) to a unique serial number matching
+    the mask: mixed radix digits over the mask alphabets"""
+    chars = []
+    for char in reversed(mask):
+        alphabet = MASK_ALPHABETS[char]
+        number, digit = divmod(number, len(alphabet))
+        chars.append(alphabet[digit])
+    return ''.join(reversed(chars))
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates equipment types with random masks and bulk inserts '
+        'equipment for them (unique serial numbers, a share soft deleted). '
+        'Cached lists, counts and ETags of running servers are invalidated '
+        'through the database; their serial number filters (see '
+        'SERIAL_NUMBER_INDEX_TTL) only see rows seeded into existing types '
+        'after the TTL or a restart'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000,
+                            help='Equipment rows to create')
+        parser.add_argument('--types', type=int, default=50,
+                            help='Equipment types to create')
+        parser.add_argument('--deleted-ratio', type=float, default=0.05,
+                            help='Share of rows created soft deleted')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed, same seed gives same data')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete previously seeded types and their '
+                                 'equipment first')
+
+    def handle(self, *args, **options):
+        if options['count'] < 0 or options['types'] < 1:
+            raise CommandError('--count must be >= 0 and --types >= 1')
+        rng = random.Random(options['seed'])
+
+        if options['clear']:
+            deleted, _ = EquipmentType.objects.filter(
+                name__startswith=SEED_TYPE_PREFIX
+            ).delete()
+            self.stdout.write(f'Deleted {deleted} seeded rows')
+
+        # room for this run and a few more on top of it
+        min_capacity = 4 * options['count'] // options['types'] + 1
+        equipment_types = []
+        offsets = {}
+        capacities = {}
+        for i in range(options['types']):
+            equipment_type, _ = EquipmentType.objects.get_or_create(
+                name=f'{SEED_TYPE_PREFIX}{options["seed"]}-{i}',
+                defaults={
+                    'serial_number_mask': random_mask(rng, min_capacity)
+                }
+            )
+            equipment_types.append(equipment_type)
+            capacities[equipment_type.pk] = mask_capacity(
+                equipment_type.serial_number_mask
+            )
+            # continue numbering after rows of a previous run
+            offsets[equipment_type.pk] = Equipment.objects.filter(
+                equipment_type=equipment_type
+            ).count()
+
+        started = time.perf_counter()
+        created = 0
+        batch_size = options['batch_size']
+        while created < options['count']:
+            size = min(batch_size, options['count'] - created)
+            batch = []
+            for i in range(created, created + size):
+                equipment_type = equipment_types[i % len(equipment_types)]
+                mask = equipment_type.serial_number_mask
+                number = offsets[equipment_type.pk]
+                offsets[equipment_type.pk] += 1
+                if number >= capacities[equipment_type.pk]:
+                    raise CommandError(
+                        f'Mask {mask} of {equipment_type.name} is '
+                        f'exhausted, use more types'
+                    )
+                batch.append(Equipment(
+                    equipment_type=equipment_type,
+                    serial_number=serial_number_for(mask, number),
+                    notes=' '.join(rng.sample(NOTES_WORDS, 2)),
+                    is_deleted=rng.random() < options['deleted_ratio'],
+                ))
+            with transaction.atomic():
+                Equipment.objects.bulk_create(batch)
+            created += size
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{created}/{options["count"]} rows, '
+                f'{created / elapsed:.0f} rows/s', ending='\r'
+            )
+
+        reconcile_active_equipment_counts()
+        # bumps the data version in the database, seen by every process
+        with transaction.atomic():
+            invalidate_equipment_caches()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} equipment rows for '
+            f'{len(equipment_types)} types in '
+            f'{time.perf_counter() - started:.1f}s'
+        ))
+        # Bloom filters live in each web process, a serial number they
+        # miss is still rejected by the unique constraint
+        self.stdout.write(
+            f'Running servers pick up serial numbers seeded into existing '
+            f'types within SERIAL_NUMBER_INDEX_TTL '
+            f'({settings.SERIAL_NUMBER_INDEX_TTL}s), restart them to do it '
+            f'right away'
+        )
@@ -1,5 +1,5 @@
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 
 
@@ -17,9 +17,8 @@ class EquipmentManager(models.Manager):
 
 class EquipmentTypeManager(models.Manager):
     def with_equipment_count(self):
+        """Active equipment count, stored on the type and kept up to date
+        by the equipment service functions"""
         return super().get_queryset().annotate(
-            equipment_count=Count(
-                'equipment',
-                filter=Q(equipment__is_deleted=False)
-            )
+            equipment_count=F('active_equipment_count')
         )
@@ -0,0 +1,114 @@
+import bisect
+import threading
+
+from .db_stats import connection_stats
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class Histogram:
+    """Bucket counts and sum of observed values, Prometheus style"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # last slot is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            lines.append(
+                f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            )
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RequestMetrics:
+    """
+    Per-process request metrics by view and method: wall time, database
+    query count and database time. Each gunicorn worker keeps its own,
+    the scraper sums them up per instance.
+    """
+    metrics = (
+        ('http_request_duration_seconds', 'Request wall time',
+         DURATION_BUCKETS),
+        ('db_queries_per_request', 'Database queries per request',
+         QUERY_COUNT_BUCKETS),
+        ('db_query_duration_seconds', 'Database time per request',
+         DURATION_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            # (view, method) -> histograms in `metrics` order
+            self._histograms = {}
+            self._responses = {}
+
+    def observe(self, view, method, status_code, duration, query_count,
+                query_duration):
+        key = (view, method)
+        with self._lock:
+            histograms = self._histograms.get(key)
+            if histograms is None:
+                histograms = self._histograms[key] = [
+                    Histogram(buckets) for _, _, buckets in self.metrics
+                ]
+            for histogram, value in zip(
+                    histograms, (duration, query_count, query_duration)
+            ):
+                histogram.observe(value)
+            response_key = (view, method, status_code)
+            self._responses[response_key] = \
+                self._responses.get(response_key, 0) + 1
+
+    def render(self) -> str:
+        """Returns metrics in Prometheus text exposition format"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            responses = sorted(self._responses.items())
+            lines = []
+            for i, (name, description, _) in enumerate(self.metrics):
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for (view, method), view_histograms in histograms:
+                    lines.extend(view_histograms[i].render(
+                        name, f'view="{view}",method="{method}"'
+                    ))
+            lines.append('# HELP http_responses_total Responses by status')
+            lines.append('# TYPE http_responses_total counter')
+            lines.extend(
+                f'http_responses_total{{view="{view}",method="{method}",'
+                f'status="{status_code}"}} {count}'
+                for (view, method, status_code), count in responses
+            )
+
+        stats = connection_stats.stats()
+        lines.extend([
+            '# HELP http_requests_total Requests handled by this process',
+            '# TYPE http_requests_total counter',
+            f'http_requests_total {stats["requests"]}',
+            '# HELP db_connections_total Database connections opened',
+            '# TYPE db_connections_total counter',
+            f'db_connections_total {stats["connections"]}',
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,107 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, \
+    sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .metrics import request_metrics
+
+
+class QueryCounter:
+    """connection.execute_wrapper counting queries and their time"""
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def get_view_name(view_func, method):
+    """Returns "ViewSet.action" for DRF viewsets, "View.method" for
+    class-based views and the function name otherwise"""
+    cls = getattr(view_func, 'cls', None) \
+        or getattr(view_func, 'view_class', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, database query count and database time per
+    resolved view into `request_metrics` and, with
+    REQUEST_METRICS_SERVER_TIMING, adds a Server-Timing header.
+
+    Queries are counted on the default connection of the thread running
+    the request's sync code. Under ASGI that is the thread Django gives
+    the request for sync views, sync middleware and sync_to_async calls
+    of async views (thread sensitive), the counter is installed there.
+    Rows of streaming responses are produced after the middleware returns
+    and are not included.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        return self.record(request, response, started, counter)
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        await sync_to_async(self.install_counter)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self.remove_counter)(counter)
+        return self.record(request, response, started, counter)
+
+    @staticmethod
+    def install_counter(counter):
+        connection.execute_wrappers.append(counter)
+
+    @staticmethod
+    def remove_counter(counter):
+        connection.execute_wrappers.remove(counter)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view_name = get_view_name(
+            view_func, request.method.lower()
+        )
+
+    def record(self, request, response, started, counter):
+        duration = time.perf_counter() - started
+        request_metrics.observe(
+            getattr(request, 'metrics_view_name', '<unresolved>'),
+            request.method, response.status_code, duration,
+            counter.count, counter.duration
+        )
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'app;dur={duration * 1000:.1f}, '
+                f'db;dur={counter.duration * 1000:.1f};'
+                f'desc="{counter.count} queries"'
+            )
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Every step maps to an online DDL statement on MySQL 8 InnoDB:
+    adding a VIRTUAL column is INSTANT and secondary indexes are built
+    INPLACE without blocking concurrent DML. The new list index is created
+    before the old is_deleted index is dropped so list queries are never
+    left without an index. Non-atomic so that completed steps are recorded
+    one by one on backends with transactional DDL.
+
+    The unique constraint fails if the table already holds duplicate
+    active (equipment_type, serial_number) pairs; soft-delete them first.
+    """
+    atomic = False
+
+    dependencies = [
+        ('equipment_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='is_active',
+            field=models.GeneratedField(db_persist=False, expression=models.Case(models.When(is_deleted=False, then=models.Value(True)), default=models.Value(None), output_field=models.BooleanField(null=True)), output_field=models.BooleanField(null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['is_deleted', 'id', 'created_at'], name='equipment_active_list_idx'),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='equipment',
+            constraint=models.UniqueConstraint(fields=('equipment_type', 'serial_number', 'is_active'), name='equipment_active_serial_number_uniq'),
+        ),
+    ]
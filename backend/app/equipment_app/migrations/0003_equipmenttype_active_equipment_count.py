@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 10:48
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_active_equipment_count(apps, schema_editor):
+    Equipment = apps.get_model('equipment_app', 'Equipment')
+    EquipmentType = apps.get_model('equipment_app', 'EquipmentType')
+    counts = (Equipment.objects
+              .filter(is_deleted=False)
+              .values('equipment_type')
+              .annotate(count=Count('id')))
+    for row in counts:
+        EquipmentType.objects.filter(pk=row['equipment_type']).update(
+            active_equipment_count=row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_app', '0002_equipment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmenttype',
+            name='active_equipment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            populate_active_equipment_count, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+FULLTEXT_INDEX_NAME = 'equipment_search_ft'
+
+
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT @@SESSION.innodb_ft_enable_stopword')
+        (enable_stopword,) = cursor.fetchone()
+    # stopwords are bound to the index at creation time, with the ngram
+    # parser they would drop every token containing e.g. "a" or "i"
+    schema_editor.execute('SET SESSION innodb_ft_enable_stopword = OFF')
+    try:
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX {FULLTEXT_INDEX_NAME} '
+            'ON equipment_app_equipment (serial_number, notes) '
+            'WITH PARSER ngram'
+        )
+    finally:
+        # the connection is reused by later migrations and by the
+        # command that ran them
+        schema_editor.execute(
+            'SET SESSION innodb_ft_enable_stopword = %s', [enable_stopword]
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        f'DROP INDEX {FULLTEXT_INDEX_NAME} ON equipment_app_equipment'
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    MySQL only. The first FULLTEXT index on an InnoDB table rebuilds it to
+    add the hidden FTS_DOC_ID column and blocks writes meanwhile, on large
+    tables run it in a maintenance window or through an online schema
+    change tool.
+    """
+
+    dependencies = [
+        ('equipment_app', '0003_equipmenttype_active_equipment_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Secondary indexes are built INPLACE on MySQL 8 InnoDB without blocking
+    concurrent DML. Non-atomic so that each index is recorded once built.
+    """
+    atomic = False
+
+    dependencies = [
+        ('equipment_app', '0004_equipment_search_fulltext'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['created_at', 'equipment_type'], name='equipment_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['is_deleted', 'updated_at', 'equipment_type'], name='equipment_deleted_at_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-18 11:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_app', '0005_equipment_created_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentCreateJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial_numbers', models.JSONField()),
+                ('notes', models.TextField(blank=True, default='')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('total', models.PositiveIntegerField()),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('errors_count', models.PositiveIntegerField(default=0)),
+                ('failure', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=255)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('equipment_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='create_jobs', to='equipment_app.equipmenttype')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EquipmentCreateJobError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('serial_number', models.TextField(blank=True)),
+                ('error', models.JSONField()),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_errors', to='equipment_app.equipmentcreatejob')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='equipmentcreatejob',
+            index=models.Index(fields=['status', 'id'], name='equipment_job_queue_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentcreatejoberror',
+            constraint=models.UniqueConstraint(fields=('job', 'index'), name='equipment_job_error_index_uniq'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 11:24
+
+import time
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    DataVersion = apps.get_model('equipment_app', 'DataVersion')
+    for name in ('equipment', 'equipment_stats'):
+        DataVersion.objects.get_or_create(
+            name=name, defaults={'version': time.time_ns()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_app', '0006_equipment_create_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
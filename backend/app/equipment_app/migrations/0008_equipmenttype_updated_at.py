@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 15:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_app', '0007_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmenttype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,213 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .cache import aget_equipment_version, get_equipment_version
+
+
+class CachedListMixin:
+    """
+    Conditional GET and server-side caching for list actions.
+    ETag is derived from the equipment data version and the requested URL,
+    so a matching If-None-Match gets 304 after a single version lookup and
+    cached pages are dropped by any write through the service layer.
+    The version is kept on the view as `equipment_version` for the
+    count cache key of the paginator.
+    """
+    equipment_version = None
+
+    def get_list_etag(self, request):
+        self.equipment_version = get_equipment_version()
+        return self.make_list_etag(request)
+
+    async def aget_list_etag(self, request):
+        """Async variant of get_list_etag"""
+        self.equipment_version = await aget_equipment_version()
+        return self.make_list_etag(request)
+
+    @staticmethod
+    def get_list_cache_key(etag):
+        return f'list_page:{etag}'
+
+    def make_list_etag(self, request):
+        query = sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+        )
+        url = request.build_absolute_uri(request.path)
+        digest = hashlib.md5(
+            f'{self.equipment_version}:{url}:{query}:'
+            f'{request.accepted_media_type}'.encode(),
+            usedforsecurity=False
+        ).hexdigest()
+        return quote_etag(digest)
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag(request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        cache_key = self.get_list_cache_key(etag)
+        data = cache.get(cache_key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            cache.set(cache_key, response.data,
+                      settings.LIST_CACHE_TIMEOUT)
+        else:
+            response = Response(data)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ValuesListMixin:
+    """
+    Opt-in fast path for list actions (settings.FAST_LIST_SERIALIZATION):
+    rows are fetched and rendered by `values_serializer_class` instead of
+    model instances going through `serializer_class`.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if (not settings.FAST_LIST_SERIALIZATION
+                or self.values_serializer_class is None):
+            return super().list(request, *args, **kwargs)
+
+        values_serializer = self.get_values_serializer()
+        queryset = values_serializer.get_values_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                values_serializer.to_representation(page)
+            )
+        return Response(values_serializer.to_representation(queryset))
+
+    def get_values_serializer(self, **kwargs):
+        return self.values_serializer_class(**kwargs)
+
+
+def get_requested_fields(query_params, allowed_fields):
+    """
+    Parses `?fields=a,b` sparse fieldset parameter
+
+    :param QueryDict query_params:
+    :param allowed_fields: container of known field names
+
+    Returns:
+        (list | None): requested fields, None when all are requested
+
+    Raises:
+        rest_framework.exceptions.ValidationError for unknown fields
+    """
+    value = query_params.get('fields', '')
+    fields = [field for field in value.split(',') if field] or None
+    if fields:
+        unknown = [field for field in fields if field not in allowed_fields]
+        if unknown:
+            raise ValidationError(detail={
+                "fields": [f"Unknown field: {field}" for field in unknown]
+            })
+    return fields
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=id,serial_number` on list actions: only the given serializer
+    fields are returned and only the columns they need are selected.
+    `sparse_fieldset_lookups` maps serializer fields to only() lookups,
+    select_related joins are dropped unless a requested lookup spans them.
+    """
+    sparse_fieldset_lookups = {}
+
+    def get_sparse_fields(self):
+        """
+        Returns:
+            (list | None): requested fields, None when all are requested
+
+        Raises:
+            rest_framework.exceptions.ValidationError for unknown fields
+        """
+        if self.action != 'list':
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = get_requested_fields(
+                self.request.query_params, self.sparse_fieldset_lookups
+            )
+        return self._sparse_fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+
+        lookups = [self.sparse_fieldset_lookups[field] for field in fields]
+        joins = {lookup.split('__')[0] for lookup in lookups if '__' in lookup}
+        queryset = queryset.select_related(None)
+        if joins:
+            queryset = queryset.select_related(*joins)
+        return queryset.only(*lookups)
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def get_values_serializer(self, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_values_serializer(**kwargs)
+
+
+class ConditionalRetrieveMixin:
+    """
+    Conditional GET for retrieve actions based on updated_at of the object
+    and of the related objects in `etag_related_fields` whose data the
+    response includes: 304 responses skip serialization.
+    """
+    etag_related_fields = ()
+
+    def get_retrieve_object(self):
+        return self.get_object()
+
+    def get_modified_times(self, instance):
+        return [instance.updated_at] + [
+            getattr(instance, field).updated_at
+            for field in self.etag_related_fields
+        ]
+
+    def get_object_etag(self, instance):
+        return quote_etag('-'.join([str(instance.pk)] + [
+            str(modified.timestamp())
+            for modified in self.get_modified_times(instance)
+        ]))
+
+    def get_last_modified(self, instance):
+        return int(max(self.get_modified_times(instance)).timestamp())
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_retrieve_object()
+        etag = self.get_object_etag(instance)
+        last_modified = self.get_last_modified(instance)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Case, Value, When
 
 from .managers import EquipmentManager, EquipmentTypeManager
 
@@ -9,6 +11,11 @@ class EquipmentType(models.Model):
     """
     name = models.CharField(max_length=255)
     serial_number_mask = models.CharField(max_length=50)
+    # Denormalized count of active equipment, see
+    # `manage.py reconcile_equipment_counts` for fixing drift
+    active_equipment_count = models.PositiveIntegerField(default=0)
+    # part of equipment ETags, equipment responses include the type name
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = EquipmentTypeManager()
 
@@ -28,7 +35,19 @@ class Equipment(models.Model):
     serial_number = models.CharField(max_length=50)
     notes = models.TextField(blank=True, null=True, max_length=255)
     # For soft delete
-    is_deleted = models.BooleanField(default=False, db_index=True)
+    is_deleted = models.BooleanField(default=False)
+    # True for active rows and NULL for soft-deleted ones, so that deleted
+    # rows never collide in unique indexes. Emulates a partial unique index
+    # on backends without them (MySQL)
+    is_active = models.GeneratedField(
+        expression=Case(
+            When(is_deleted=False, then=Value(True)),
+            default=Value(None),
+            output_field=models.BooleanField(null=True),
+        ),
+        output_field=models.BooleanField(null=True),
+        db_persist=False,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -36,6 +55,121 @@ class Equipment(models.Model):
 
     class Meta:
         app_label = 'equipment_app'
-        
+        constraints = [
+            # serial number is unique among active equipment of a type,
+            # the index also serves (equipment_type, serial_number) lookups
+            models.UniqueConstraint(
+                fields=['equipment_type', 'serial_number', 'is_active'],
+                name='equipment_active_serial_number_uniq',
+            ),
+        ]
+        indexes = [
+            # active() list ordered by (id, created_at)
+            models.Index(
+                fields=['is_deleted', 'id', 'created_at'],
+                name='equipment_active_list_idx',
+            ),
+            # created_at range filters and created stats per type,
+            # covering so stats are counted from the index alone
+            models.Index(
+                fields=['created_at', 'equipment_type'],
+                name='equipment_created_at_idx',
+            ),
+            # soft-deleted stats: deleted rows keep updated_at of deletion
+            models.Index(
+                fields=['is_deleted', 'updated_at', 'equipment_type'],
+                name='equipment_deleted_at_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.equipment_type.name} - {self.serial_number}"
+
+
+class DataVersion(models.Model):
+    """
+    Version counters of cached data. Kept in the database rather than in
+    the cache so writes of any process (web workers, job workers,
+    management commands) invalidate the caches of all others, whether
+    the cache is shared or per-process.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField()
+
+    class Meta:
+        app_label = 'equipment_app'
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
+
+
+class EquipmentCreateJob(models.Model):
+    """
+    Bulk create of equipment run in the background by
+    `manage.py run_equipment_jobs` workers, chunk by chunk.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    equipment_type = models.ForeignKey(EquipmentType,
+                                       on_delete=models.CASCADE,
+                                       related_name='create_jobs')
+    serial_numbers = models.JSONField()
+    notes = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True,
+                                   on_delete=models.SET_NULL,
+                                   related_name='+')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES,
+                              default=STATUS_PENDING)
+    total = models.PositiveIntegerField()
+    # serial numbers handled so far, chunks commit together with it so
+    # a reclaimed job resumes exactly where the previous worker stopped
+    processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    errors_count = models.PositiveIntegerField(default=0)
+    failure = models.TextField(blank=True, default='')
+    # "host:pid" of the worker owning a running job
+    worker = models.CharField(max_length=255, blank=True, default='')
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        app_label = 'equipment_app'
+        indexes = [
+            # workers pick the oldest pending or stale running job
+            models.Index(fields=['status', 'id'],
+                         name='equipment_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.status}): " \
+               f"{self.processed}/{self.total}"
+
+
+class EquipmentCreateJobError(models.Model):
+    """
+    Serial number of a create job that wasn't created.
+    """
+    job = models.ForeignKey(EquipmentCreateJob, on_delete=models.CASCADE,
+                            related_name='item_errors')
+    index = models.PositiveIntegerField()
+    serial_number = models.TextField(blank=True)
+    error = models.JSONField()
+
+    class Meta:
+        app_label = 'equipment_app'
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'index'],
+                                    name='equipment_job_error_index_uniq'),
+        ]
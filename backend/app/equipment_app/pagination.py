@@ -1,7 +1,327 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from functools import partial
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, \
+    PageNumberPagination, _reverse_ordering
+
+from .cache import get_equipment_version
+
+
+def estimate_table_rows(model):
+    """
+    Returns row count estimate from table statistics, None if the backend
+    doesn't keep them.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table]
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator reading count from cache (or from table statistics
+    when estimate is allowed) before falling back to COUNT(*).
+    """
+
+    def __init__(self, *args, count_cache_key=None, count_cache_timeout=None,
+                 estimate=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_cache_key = count_cache_key
+        self.count_cache_timeout = count_cache_timeout
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        if self.estimate:
+            estimated = estimate_table_rows(self.object_list.model)
+            if estimated is not None:
+                return estimated
+
+        count = cache.get(self.count_cache_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_cache_key, count, self.count_cache_timeout)
+        return count
+
+    async def acount(self):
+        """Async variant of count, stores the result as count"""
+        count = None
+        if self.estimate:
+            count = await sync_to_async(estimate_table_rows)(
+                self.object_list.model
+            )
+        if count is None:
+            count = await cache.aget(self.count_cache_key)
+        if count is None:
+            count = await self.object_list.acount()
+            await cache.aset(self.count_cache_key, count,
+                             self.count_cache_timeout)
+        self.count = count
+        return count
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class CachedCountPagination(StandardResultsSetPagination):
+    """
+    Page number pagination with total count cached per view and filter
+    parameters for a short time. Cached counts are dropped on equipment
+    writes through the service layer.
+    ?count=estimated on unfiltered lists returns count from table
+    statistics instead (includes soft-deleted rows).
+    """
+    count_query_param = 'count'
+    # parameters not affecting the count
+    count_ignored_params = {'page', 'page_size', 'pagination', 'cursor',
+                            'count', 'format'}
+
+    def get_filter_params(self, request):
+        return sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+            if key not in self.count_ignored_params
+        )
+
+    def get_count_cache_key(self, filter_params, view, version=None):
+        if version is None:
+            version = getattr(view, 'equipment_version', None)
+        if version is None:
+            version = get_equipment_version()
+        view_name = getattr(view, 'basename', None) or type(view).__name__
+        digest = hashlib.md5(
+            repr(filter_params).encode(), usedforsecurity=False
+        ).hexdigest()
+        return f'list_count:{version}:{view_name}:{digest}'
+
+    def set_paginator_class(self, request, view):
+        filter_params = self.get_filter_params(request)
+        self.count_is_estimate = (
+            not filter_params
+            and request.query_params.get(self.count_query_param)
+            == 'estimated'
+        )
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            count_cache_key=self.get_count_cache_key(filter_params, view),
+            count_cache_timeout=settings.LIST_COUNT_CACHE_TIMEOUT,
+            estimate=self.count_is_estimate,
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.set_paginator_class(request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async variant of paginate_queryset: count and page rows are read
+        with the async ORM, page validation and links are the same.
+        The view has to provide `equipment_version` for the count cache
+        key, it can't be read with the sync ORM here.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.set_paginator_class(request, view)
+        paginator = self.django_paginator_class(queryset, page_size)
+        await paginator.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Set to "estimated" to take count from table '
+                           'statistics (unfiltered lists only)',
+            'schema': {'type': 'string', 'enum': ['estimated']},
+        }]
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on id: every page is `WHERE id > ? LIMIT ?`,
+    no OFFSET and no COUNT(*), so deep pages cost the same as the first one.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """First part of CursorPagination.paginate_queryset: returns the
+        slice holding the page and one row past it, None if pagination is
+        off. Split out so the rows can be read with the sync or async ORM.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+            if self.cursor.reverse != is_reversed:
+                kwargs = {order_attr + '__lt': current_position}
+            else:
+                kwargs = {order_attr + '__gt': current_position}
+            queryset = queryset.filter(**kwargs)
+
+        self._page_cursor = (offset, reverse, current_position)
+        return queryset[offset:offset + self.page_size + 1]
+
+    def set_page(self, results):
+        """Second part of CursorPagination.paginate_queryset: sets the page
+        and next/previous positions from the rows of get_page_queryset"""
+        offset, reverse, current_position = self._page_cursor
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async variant of paginate_queryset"""
+        page_queryset = self.get_page_queryset(queryset, request, view)
+        if page_queryset is None:
+            return None
+        return self.set_page([row async for row in page_queryset])
+
+
+class OptionalCursorPagination(CachedCountPagination):
+    """
+    Page number pagination by default, cursor pagination when requested
+    with ?pagination=cursor (next/previous links keep the parameter).
+    """
+    mode_query_param = 'pagination'
+    cursor_pagination_class = IdCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async variant of paginate_queryset"""
+        self.cursor_paginator = None
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.cursor_paginator = self.cursor_pagination_class()
+            return await self.cursor_paginator.apaginate_queryset(
+                queryset, request, view
+            )
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to "cursor" for keyset pagination '
+                               'without total count',
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            {
+                'name': self.cursor_pagination_class.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor value (cursor pagination only)',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -0,0 +1,43 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+
+class StreamingUploadParser(BaseParser):
+    """
+    Leaves the request body unread so it can be consumed line by line.
+    request.data is the underlying file-like request stream.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream
+
+
+class CSVStreamParser(StreamingUploadParser):
+    media_type = 'text/csv'
+
+
+class NDJSONStreamParser(StreamingUploadParser):
+    media_type = 'application/x-ndjson'
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser using orjson. Falls back to stdlib json for non UTF-8
+    bodies and non-strict parsing (orjson never accepts NaN/Infinity).
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (orjson is None or not self.strict
+                or encoding.lower().replace('_', '-') != 'utf-8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
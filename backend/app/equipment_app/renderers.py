@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+                  if orjson else 0)
+
+# types orjson doesn't handle natively (Decimal, lazy strings, timedelta,
+# QuerySet, ...) are converted exactly like in DRF's JSONEncoder
+_default = encoders.JSONEncoder().default
+
+
+def _contains_float(data) -> bool:
+    """True if data holds floats (or Decimals, encoded as floats), orjson
+    formats them differently (1e16, not 1e+16) and writes nan/inf as null
+    instead of failing in strict mode"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (float, Decimal)):
+            return True
+        if isinstance(value, dict):
+            stack.extend(value)
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same output with orjson.
+
+    Falls back to stdlib json for data with floats and for settings orjson
+    can't reproduce: non-compact, ASCII-only or non-strict output and
+    indents other than 2.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if (orjson is None or indent not in (None, 2)
+                or self.ensure_ascii or not self.compact
+                or not self.strict or _contains_float(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        options = ORJSON_OPTIONS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=_default, option=options)
+        except orjson.JSONEncodeError:
+            # e.g. integers over 64 bits, stdlib json has no such limits
+            return super().render(data, accepted_media_type, renderer_context)
+        # same as JSONRenderer: escape separators that are invalid in JS
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+        return ret
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Func, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.lookups import GreaterThan
+
+from .models import Equipment, EquipmentType
+
+
+class FullTextMatch(Func):
+    """MySQL MATCH (...) AGAINST (... IN BOOLEAN MODE) relevance"""
+    template = 'MATCH (%(expressions)s) AGAINST (%%s IN BOOLEAN MODE)'
+
+    def __init__(self, *expressions, against, **extra):
+        super().__init__(*expressions, output_field=FloatField(), **extra)
+        self.against = against
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, (*params, self.against)
+
+
+def _can_use_fulltext(value):
+    """
+    FULLTEXT ngram index returns a superset of substring matches only for
+    alphanumeric terms not shorter than the server's ngram_token_size
+    """
+    return (
+        settings.EQUIPMENT_SEARCH_FULLTEXT
+        and connection.vendor == 'mysql'
+        and value.isalnum()
+        and len(value) >= settings.EQUIPMENT_SEARCH_NGRAM_TOKEN_SIZE
+    )
+
+
+def equipment_search_q(value) -> Q:
+    """
+    Builds filter for the equipment search box, matching serial_number
+    (case-sensitive substring), notes and equipment type name
+    (case-insensitive substrings).
+
+    Type names are matched in a subquery against the small equipment
+    type table, so the condition needs no join and building it runs no
+    query (safe in async views). On MySQL text fields are narrowed by
+    the ngram FULLTEXT index and then rechecked with LIKE, which keeps
+    results identical to plain LIKE filtering. MySQL can't use the
+    FULLTEXT index for MATCH ORed with another condition, so there the
+    text and type matches are separate selects joined with UNION.
+    """
+    q_text = Q(serial_number__contains=value) | Q(notes__icontains=value)
+    q_type = Q(equipment_type_id__in=EquipmentType.objects.filter(
+        name__icontains=value
+    ).values('pk'))
+    if not _can_use_fulltext(value):
+        return q_text | q_type
+
+    q_text &= GreaterThan(
+        FullTextMatch('serial_number', 'notes', against=f'"{value}"'), 0
+    )
+    pk_name = Equipment._meta.pk.attname
+    text_sql, text_params = Equipment.objects.filter(
+        q_text
+    ).order_by().values(pk_name).query.sql_with_params()
+    type_sql, type_params = Equipment.objects.filter(
+        q_type
+    ).order_by().values(pk_name).query.sql_with_params()
+    return Q(pk__in=RawSQL(
+        # the derived table lets MySQL materialize the UNION once instead
+        # of running it for every row of the outer query
+        f'SELECT {pk_name} FROM ({text_sql} UNION {type_sql}) '
+        f'AS equipment_search_ids',
+        (*text_params, *type_params)
+    ))
@@ -1,7 +1,9 @@
-from django.contrib.auth.models import User
-from rest_framework import serializers
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 
-from .models import Equipment, EquipmentType
+from .models import Equipment, EquipmentCreateJob, EquipmentType
 
 
 class UserLoginSerializer(serializers.Serializer):
@@ -14,11 +16,6 @@ class UserRegisterSerializer(serializers.Serializer):
     password = serializers.CharField(required=True)
     email = serializers.EmailField(required=False)
 
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("Username already exists")
-        return value
-
 
 class EquipmentTypeSerializer(serializers.ModelSerializer):
     """
@@ -31,7 +28,33 @@ class EquipmentTypeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'serial_number_mask', 'equipment_count']
 
 
-class EquipmentSerializer(serializers.ModelSerializer):
+class EquipmentCreateJobSerializer(serializers.ModelSerializer):
+    """
+    Progress of a background bulk create.
+    """
+
+    class Meta:
+        model = EquipmentCreateJob
+        fields = ['id', 'status', 'equipment_type', 'total', 'processed',
+                  'created', 'errors_count', 'failure', 'created_at',
+                  'started_at', 'finished_at']
+        read_only_fields = fields
+
+
+class SparseFieldsMixin:
+    """
+    Accepts `fields` kwarg restricting the serializer to the given fields
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class EquipmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Equipment model.
     """
@@ -44,3 +67,70 @@ class EquipmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'equipment_type', 'equipment_type_name',
                   'serial_number', 'notes', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
+
+
+def _get_datetime_formatter():
+    """
+    Returns function formatting datetimes the way DRF DateTimeField does,
+    inlined for the common ISO 8601 + USE_TZ configuration.
+    """
+    output_format = api_settings.DATETIME_FORMAT
+    if (not settings.USE_TZ or output_format is None
+            or output_format.lower() != ISO_8601):
+        return serializers.DateTimeField().to_representation
+
+    current_timezone = timezone.get_current_timezone()
+
+    def format_datetime(value):
+        if not value:
+            return None
+        value = value.astimezone(current_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_datetime
+
+
+class EquipmentValuesSerializer:
+    """
+    Read-only fast path producing the same output as EquipmentSerializer.
+    Only the needed columns are fetched with values_list() and response
+    dicts are built directly, without per-field to_representation.
+    """
+    # serializer field -> values() lookup
+    values_fields = {
+        'id': 'id',
+        'equipment_type': 'equipment_type_id',
+        'equipment_type_name': 'equipment_type__name',
+        'serial_number': 'serial_number',
+        'notes': 'notes',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    datetime_fields = {'created_at', 'updated_at'}
+
+    def __init__(self, fields=None):
+        self.fields = [field for field in self.values_fields
+                       if fields is None or field in fields]
+
+    def get_values_queryset(self, queryset):
+        lookups = [self.values_fields[field] for field in self.fields]
+        if 'id' not in self.fields:
+            # cursor pagination reads the position from row.id,
+            # trailing column is ignored by to_representation
+            lookups.append('id')
+        return queryset.values_list(*lookups, named=True)
+
+    def to_representation(self, rows):
+        format_datetime = _get_datetime_formatter()
+        fields = self.fields
+        datetime_fields = [field for field in fields
+                           if field in self.datetime_fields]
+        data = []
+        for row in rows:
+            item = dict(zip(fields, row))
+            for field in datetime_fields:
+                item[field] = format_datetime(item[field])
+            data.append(item)
+        return data
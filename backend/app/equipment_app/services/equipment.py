@@ -1,8 +1,18 @@
-import re
-
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Subquery, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.utils.html import escape
 from rest_framework.exceptions import ValidationError
 
+from equipment_app.cache import invalidate_equipment_caches, \
+    invalidate_equipment_stats
+from .serial_index import serial_number_index
+from .serial_mask import compile_serial_number_mask
+
+# Upper bound for IN (...) lists sent to the database in a single query
+SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE = 1000
+
 
 def _get_serial_numbers_errors(
         serial_number, serial_number_mask
@@ -16,45 +26,141 @@ def _get_serial_numbers_errors(
     Returns:
         list: list of errors
     """
-    sn_len = len(serial_number)
-    mask_len = len(serial_number_mask)
-    if sn_len != mask_len:
-        return [
-            f"Serial number must be {mask_len} "
-            f"characters long, current length: {sn_len}"
-        ]
+    return compile_serial_number_mask(serial_number_mask).get_errors(
+        serial_number
+    )
 
-    errors = []
-    char_patterns = {
-        'N': r'^[0-9]$',
-        'A': r'^[A-Z]$',
-        'a': r'^[a-z]$',
-        'X': r'^[A-Z0-9]$',
-        'Z': r'^[-_@]$'
-    }
-    error_messages = {
-        'N': "must be a digit (0-9)",
-        'A': "must be an uppercase letter",
-        'a': "must be a lowercase letter",
-        'X': "must be an uppercase letter or digit",
-        'Z': "must be one of: -, _, @"
-    }
-    for i, (char, mask_char) in enumerate(
-            zip(serial_number, serial_number_mask)
+
+def _get_existing_serial_numbers(equipment_type, serial_numbers) -> set:
+    """
+    Returns serial numbers that already exist among active equipment
+    of the given type. Serial numbers the serial number index rules out
+    are not queried, the rest are looked up in chunks to keep IN lists
+    bounded.
+
+    :param equipment_app.models.EquipmentType equipment_type:
+    :param list serial_numbers:
+
+    Returns:
+        set: existing serial numbers
+    """
+    from equipment_app.models import Equipment  # fix circular import
+
+    existing = set()
+    candidates = serial_number_index.possible_matches(
+        equipment_type.pk, list(dict.fromkeys(serial_numbers))
+    )
+    for start in range(
+            0, len(candidates), SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE
     ):
-        pattern = char_patterns.get(mask_char)
-        if not pattern:
-            raise ValidationError(
-                f"Unknown mask character '{mask_char}' at position {i + 1}"
-            )
+        chunk = candidates[start:start + SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE]
+        existing.update(
+            Equipment.objects.active().filter(
+                equipment_type=equipment_type,
+                serial_number__in=chunk
+            ).values_list('serial_number', flat=True)
+        )
+    serial_number_index.record_confirmed(len(existing))
+    return existing
 
-        if not re.match(pattern, char):
-            errors.append(
-                f"Character at position {i + 1} "
-                f"{error_messages[mask_char]}"
-            )
 
-    return errors
+def _get_duplicate_serial_numbers_errors(serial_numbers) -> list:
+    """
+    Finds serial numbers repeated in the request in a single pass.
+    Every occurrence of a duplicate is reported with its real index.
+
+    :param list serial_numbers:
+
+    Returns:
+        list: list of error dicts ordered by index
+    """
+    positions = {}
+    for i, serial_number in enumerate(serial_numbers):
+        positions.setdefault(serial_number, []).append(i)
+
+    if len(positions) == len(serial_numbers):
+        return []
+
+    duplicate_indexes = sorted(
+        i for indexes in positions.values() if len(indexes) > 1
+        for i in indexes
+    )
+    return [{
+        "index": i,
+        "serial_number": serial_numbers[i],
+        "error": ["Duplicate serial number in request"]
+    } for i in duplicate_indexes]
+
+
+def _set_bulk_inserted_pks(equipment_type, equipments):
+    """
+    Sets primary keys on objects inserted by bulk_create on backends that
+    can't return rows from a bulk INSERT (MySQL). On MySQL ids are read back
+    with a single id range scan starting at LAST_INSERT_ID(), which is the
+    first id generated by the multi-row INSERT on this connection.
+
+    :param equipment_app.models.EquipmentType equipment_type:
+    :param list equipments: objects just inserted by bulk_create
+    """
+    from equipment_app.models import Equipment  # fix circular import
+
+    queryset = Equipment.objects.filter(
+        equipment_type=equipment_type, is_deleted=False
+    )
+    by_serial_number = {
+        equipment.serial_number: equipment for equipment in equipments
+    }
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT LAST_INSERT_ID()')
+            first_id = cursor.fetchone()[0]
+        queryset = queryset.filter(pk__gte=first_id)
+    else:
+        queryset = queryset.filter(serial_number__in=by_serial_number)
+
+    rows = queryset.order_by('pk').values_list('pk', 'serial_number')
+    for pk, serial_number in rows.iterator():
+        equipment = by_serial_number.pop(serial_number, None)
+        if equipment is not None:
+            equipment.pk = pk
+        if not by_serial_number:
+            break
+
+
+def _parse_equipment_type_id(value):
+    """Returns equipment type id sent as int or numeric string (form data),
+    None for any other value
+
+    :param value: equipment_type of the request
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _adjust_active_equipment_count(equipment_type_id, delta):
+    """Atomically changes stored active equipment count of the type
+
+    :param (int | django.db.models.Subquery) equipment_type_id:
+    :param int delta:
+    """
+    from equipment_app.models import EquipmentType  # fix circular import
+
+    count = F('active_equipment_count')
+    if delta < 0:
+        # never go below zero if the stored count drifted
+        count = Greatest(count, Value(-delta))
+    if delta:
+        EquipmentType.objects.filter(pk=equipment_type_id).update(
+            active_equipment_count=count + delta
+        )
 
 
 def _validate_and_prepare_bulk_equipment(
@@ -71,31 +177,27 @@ def _validate_and_prepare_bulk_equipment(
     errors = []
 
     # check no duplicates in the request
-    if len(serial_numbers) != len(set(serial_numbers)):
-        duplicates = {x for x in serial_numbers if serial_numbers.count(x) > 1}
+    duplicates_errors = _get_duplicate_serial_numbers_errors(serial_numbers)
+    if duplicates_errors:
         raise ValidationError(
-            detail={
-                "serial_numbers_errors": [{
-                    "index": i,
-                    "serial_number": sn,
-                    "error": ["Duplicate serial number in request"]
-                } for i, sn in enumerate(duplicates)]
-            }
+            detail={"serial_numbers_errors": duplicates_errors}
         )
 
+    existing_serial_numbers = _get_existing_serial_numbers(
+        equipment_type, serial_numbers
+    )
+    serial_number_mask = compile_serial_number_mask(
+        equipment_type.serial_number_mask
+    )
+
     for i, serial_number in enumerate(serial_numbers):
         try:
-            if Equipment.objects.active().filter(
-                equipment_type=equipment_type,
-                serial_number__exact=serial_number
-            ).exists():
+            if serial_number in existing_serial_numbers:
                 raise ValidationError(
                     "This serial number already exists for this equipment type"
                 )
 
-            current_sn_errors = _get_serial_numbers_errors(
-                serial_number, equipment_type.serial_number_mask
-            )
+            current_sn_errors = serial_number_mask.get_errors(serial_number)
             if current_sn_errors:
                 raise ValidationError(current_sn_errors)
 
@@ -130,7 +232,7 @@ def create_equipment(equipment_type_id, serial_numbers, notes=""):
     :param str notes:
 
     Returns:
-        list: list of Equipment
+        list: list of created Equipment in request order
 
     Raises:
         rest_framework.exceptions.ValidationError with error dict
@@ -182,19 +284,42 @@ def create_equipment(equipment_type_id, serial_numbers, notes=""):
     equipments = _validate_and_prepare_bulk_equipment(
         equipment_type, serial_numbers, notes
     )
-    Equipment.objects.bulk_create(equipments)
+    try:
+        with transaction.atomic():
+            Equipment.objects.bulk_create(equipments)
+            if equipments and equipments[0].pk is None:
+                _set_bulk_inserted_pks(equipment_type, equipments)
+            _adjust_active_equipment_count(equipment_type.pk, len(equipments))
+            invalidate_equipment_caches()
+            serial_number_index.add(equipment_type.pk, serial_numbers)
+    except IntegrityError:
+        # lost a race with a concurrent create of the same serial numbers
+        # or the serial number index missed rows written elsewhere:
+        # recheck against the database for per-index errors
+        serial_number_index.invalidate(equipment_type.pk)
+        _validate_and_prepare_bulk_equipment(
+            equipment_type, serial_numbers, notes
+        )
+        raise ValidationError(
+            detail={
+                "serial_numbers_errors": [{
+                    "index": 0,
+                    "serial_number": "",
+                    "error": "Some serial numbers were created concurrently "
+                             "for this equipment type"
+                }],
+            }
+        )
 
-    return Equipment.objects.filter(
-        equipment_type=equipment_type,
-        serial_number__in=serial_numbers
-    ).order_by('id')
+    return equipments
 
 
 def update_equipment(equipment, equipment_type, serial_number, notes):
     """Updates Equipment object. Includes validation
 
     :param equipment_app.models.Equipment equipment:
-    :param (equipment_app.models.EquipmentType | None) equipment_type:
+    :param (equipment_app.models.EquipmentType | int | str | None)
+        equipment_type: new type or its id
     :param (str | None) serial_number:
     :param (str | None) notes:
 
@@ -217,12 +342,27 @@ def update_equipment(equipment, equipment_type, serial_number, notes):
         notes = escape(notes)  # XSS injection protection
         updated_fields['notes'] = notes
 
-    if equipment_type is None:
-        equipment_type = equipment.equipment_type
+    if isinstance(equipment_type, EquipmentType):
+        equipment_type = equipment_type.pk
+    new_type_id = None
+    if equipment_type is not None:
+        new_type_id = _parse_equipment_type_id(equipment_type)
+        if new_type_id is None:
+            raise ValidationError(
+                detail={
+                    "serial_numbers_errors": [{
+                        "index": 0,
+                        "serial_number": "",
+                        "error": "Invalid value for equipment_type, "
+                                 "must be correct id(int)"
+                    }],
+                }
+            )
 
-    if equipment.equipment_type != equipment_type:
+    equipment_type = equipment.equipment_type
+    if new_type_id is not None and new_type_id != equipment.equipment_type_id:
         try:
-            equipment_type = EquipmentType.objects.get(pk=equipment_type)
+            equipment_type = EquipmentType.objects.get(pk=new_type_id)
             updated_fields['equipment_type'] = equipment_type
             need_serial_validation = True
         except EquipmentType.DoesNotExist:
@@ -243,10 +383,13 @@ def update_equipment(equipment, equipment_type, serial_number, notes):
         sn_errors = _get_serial_numbers_errors(
             serial_number, equipment_type.serial_number_mask
         )
-        if not sn_errors and Equipment.objects.active().filter(
+        if not sn_errors and serial_number_index.possible_matches(
+            equipment_type.pk, [serial_number]
+        ) and Equipment.objects.active().filter(
             equipment_type=equipment_type,
             serial_number__exact=serial_number
         ).exclude(pk=equipment.pk).exists():
+            serial_number_index.record_confirmed(1)
             sn_errors.append(
                 "This serial number already exists for this equipment type."
             )
@@ -264,13 +407,104 @@ def update_equipment(equipment, equipment_type, serial_number, notes):
         )
 
     if updated_fields:
+        old_equipment_type_id = equipment.equipment_type_id
         for field, value in updated_fields.items():
             setattr(equipment, field, value)
-        equipment.save()
+        try:
+            with transaction.atomic():
+                # write only changed columns, updated_at is set by auto_now
+                equipment.save(
+                    update_fields=[*updated_fields, 'updated_at']
+                )
+                if old_equipment_type_id != equipment.equipment_type_id:
+                    # lock type rows in a fixed order to avoid deadlocks
+                    for type_id, delta in sorted([
+                        (old_equipment_type_id, -1),
+                        (equipment.equipment_type_id, 1),
+                    ]):
+                        _adjust_active_equipment_count(type_id, delta)
+                    # created counts are grouped by the current type
+                    invalidate_equipment_stats()
+                invalidate_equipment_caches()
+                serial_number_index.add(
+                    equipment.equipment_type_id, [equipment.serial_number]
+                )
+        except IntegrityError:
+            # unique constraint caught a concurrent update or create
+            serial_number_index.invalidate(equipment.equipment_type_id)
+            raise ValidationError(
+                detail={
+                    "serial_numbers_errors": [{
+                        "index": 0,
+                        "serial_number": serial_number,
+                        "error": ["This serial number already exists "
+                                  "for this equipment type."]
+                    }],
+                }
+            )
 
     return equipment
 
 
-def soft_delete_equipment(equipment):
-    equipment.is_deleted = True
-    equipment.save()
+def soft_delete_equipment(equipment_id) -> bool:
+    """Soft deletes Equipment with a single conditional UPDATE,
+    without loading the row. Idempotent: deleting already deleted or
+    missing equipment changes nothing.
+
+    :param int equipment_id:
+
+    Returns:
+        bool: True if active equipment was deleted
+    """
+    from equipment_app.models import Equipment  # fix circular import
+
+    with transaction.atomic():
+        deleted = Equipment.objects.filter(
+            pk=equipment_id, is_deleted=False
+        ).update(is_deleted=True, updated_at=timezone.now())
+        if deleted:
+            _adjust_active_equipment_count(
+                Subquery(Equipment.objects.filter(
+                    pk=equipment_id
+                ).values('equipment_type_id')),
+                -1
+            )
+            invalidate_equipment_caches()
+    return bool(deleted)
+
+
+def reconcile_active_equipment_counts(dry_run=False) -> dict:
+    """Recomputes stored active equipment counts and fixes drift
+
+    :param bool dry_run: only report drift
+
+    Returns:
+        dict: {equipment type id: (stored count, actual count)} for types
+        whose stored count was wrong
+    """
+    # fix circular imports
+    from equipment_app.models import Equipment, EquipmentType
+
+    actual_counts = dict(
+        Equipment.objects.active()
+        .order_by()
+        .values('equipment_type')
+        .annotate(count=Count('id'))
+        .values_list('equipment_type', 'count')
+    )
+    drift = {}
+    for type_id, stored in EquipmentType.objects.values_list(
+            'id', 'active_equipment_count'
+    ):
+        actual = actual_counts.get(type_id, 0)
+        if stored != actual:
+            drift[type_id] = (stored, actual)
+
+    if not dry_run:
+        for type_id, (_, actual) in drift.items():
+            EquipmentType.objects.filter(pk=type_id).update(
+                active_equipment_count=actual
+            )
+        if drift:
+            invalidate_equipment_caches()
+    return drift
@@ -0,0 +1,12 @@
+async def aget_active_equipment(equipment_id):
+    """Returns active Equipment with its type loaded, None if not found
+
+    :param int equipment_id:
+
+    Returns:
+        (Equipment | None)
+    """
+    from equipment_app.models import Equipment  # fix circular import
+
+    return await Equipment.objects.active().filter(pk=equipment_id).afirst()
+
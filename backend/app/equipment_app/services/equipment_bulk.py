@@ -0,0 +1,316 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.html import escape
+from rest_framework.exceptions import ValidationError
+
+from equipment_app.cache import invalidate_equipment_caches, \
+    invalidate_equipment_stats
+from .equipment import SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE, \
+    _adjust_active_equipment_count, _get_existing_serial_numbers, \
+    _parse_equipment_type_id
+from .serial_index import serial_number_index
+from .serial_mask import compile_serial_number_mask
+
+
+def _item_error(index, serial_number, error):
+    return {
+        "index": index,
+        "serial_number": serial_number,
+        "error": error
+    }
+
+
+def _raise_items_errors(errors):
+    raise ValidationError(detail={"serial_numbers_errors": errors})
+
+
+def _get_ids(items, require_dicts=False) -> list:
+    """Validates that every item (id or dict with "id") has a unique
+    integer id
+
+    Raises:
+        rest_framework.exceptions.ValidationError
+    """
+    if not isinstance(items, list) or not items:
+        _raise_items_errors([_item_error(
+            0, "", "A non-empty list of items is required"
+        )])
+
+    ids = []
+    errors = []
+    seen = set()
+    for i, item in enumerate(items):
+        if require_dicts and not isinstance(item, dict):
+            errors.append(_item_error(i, "", ["Item must be an object"]))
+            ids.append(None)
+            continue
+        item_id = item.get('id') if isinstance(item, dict) else item
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            errors.append(_item_error(
+                i, "", ["Invalid value for id, must be correct id(int)"]
+            ))
+        elif item_id in seen:
+            errors.append(_item_error(i, "", ["Duplicate id in request"]))
+        seen.add(item_id)
+        ids.append(item_id)
+
+    if errors:
+        _raise_items_errors(errors)
+    return ids
+
+
+def _get_active_equipment(ids, for_update=False) -> dict:
+    """Returns active equipment by id, loaded in chunks"""
+    from equipment_app.models import Equipment  # fix circular import
+
+    equipment_by_id = {}
+    for start in range(0, len(ids), SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE):
+        queryset = Equipment.objects.active().filter(
+            pk__in=ids[start:start + SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE]
+        )
+        if for_update:
+            queryset = queryset.select_for_update(of=('self',))
+        equipment_by_id.update((e.pk, e) for e in queryset)
+    return equipment_by_id
+
+
+def _lock_active_equipment_types(ids) -> dict:
+    """Locks active equipment and returns its type id by equipment id,
+    loaded in chunks"""
+    from equipment_app.models import Equipment  # fix circular import
+
+    type_id_by_id = {}
+    for start in range(0, len(ids), SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE):
+        type_id_by_id.update(
+            Equipment.objects.active().filter(
+                pk__in=ids[start:start + SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE]
+            ).select_related(None).select_for_update(
+                of=('self',)
+            ).values_list('pk', 'equipment_type_id')
+        )
+    return type_id_by_id
+
+
+def _adjust_counts(deltas):
+    """Applies per-type count deltas, locking type rows in a fixed order"""
+    for type_id, delta in sorted(deltas.items()):
+        _adjust_active_equipment_count(type_id, delta)
+
+
+def bulk_update_equipment(items) -> list:
+    """Updates multiple Equipment objects. Includes validation
+
+    Serial numbers are validated against masks grouped by target type,
+    uniqueness is checked with one chunked lookup per type and rows are
+    written with a single bulk_update. Nothing is written if any item fails.
+    A serial number given up by one item can't be taken by another item of
+    the same request.
+
+    :param list items: dicts with "id" and optional "equipment_type",
+        "serial_number", "notes"
+
+    Returns:
+        list: updated Equipment in request order
+
+    Raises:
+        rest_framework.exceptions.ValidationError with error dict
+        "serial_numbers_errors": list of errors with index of the item
+    """
+    from equipment_app.models import Equipment, EquipmentType
+
+    ids = _get_ids(items, require_dicts=True)
+    with transaction.atomic():
+        # lock the rows so concurrent deletes and updates can't skew
+        # type counts
+        equipment_by_id = _get_active_equipment(ids, for_update=True)
+        # ids as int or numeric string, like the single item update
+        new_type_ids = [
+            _parse_equipment_type_id(item.get('equipment_type'))
+            for item in items
+        ]
+        equipment_types = EquipmentType.objects.in_bulk(
+            {type_id for type_id in new_type_ids if type_id is not None}
+        )
+
+        errors = []
+        changes = []
+        # (index, target type, serial_number) needing validation
+        to_validate = []
+        for i, (item, item_id, new_type_id) in enumerate(
+            zip(items, ids, new_type_ids)
+        ):
+            equipment = equipment_by_id.get(item_id)
+            if equipment is None:
+                errors.append(_item_error(i, "", ["Equipment not found"]))
+                continue
+
+            updated_fields = {}
+            equipment_type = equipment.equipment_type
+            if item.get('equipment_type') is not None \
+                    and new_type_id is None:
+                errors.append(_item_error(
+                    i, "", ["Invalid value for equipment_type, "
+                            "must be correct id(int)"]
+                ))
+                continue
+            if new_type_id is not None and new_type_id != equipment_type.pk:
+                equipment_type = equipment_types.get(new_type_id)
+                if equipment_type is None:
+                    errors.append(_item_error(
+                        i, "", ["New equipment type not found"]
+                    ))
+                    continue
+                updated_fields['equipment_type'] = equipment_type
+
+            serial_number = item.get('serial_number')
+            if serial_number is None:
+                serial_number = equipment.serial_number
+            elif not isinstance(serial_number, str):
+                errors.append(_item_error(
+                    i, "", ["Serial number must be a string"]
+                ))
+                continue
+            if serial_number != equipment.serial_number:
+                updated_fields['serial_number'] = serial_number
+
+            notes = item.get('notes')
+            if notes is not None and notes != equipment.notes:
+                # XSS injection protection
+                updated_fields['notes'] = escape(notes)
+
+            if ('serial_number' in updated_fields
+                    or 'equipment_type' in updated_fields):
+                to_validate.append((i, equipment_type, serial_number))
+            changes.append((equipment, updated_fields))
+
+        # serial numbers given up by items of this request. The rows are
+        # written by one UPDATE per batch and the unique constraint is
+        # checked row by row, so taking them over (e.g. swapping two
+        # serial numbers) depends on row order and is not supported
+        released = {
+            (equipment.equipment_type_id, equipment.serial_number)
+            for equipment, updated_fields in changes
+            if 'serial_number' in updated_fields
+            or 'equipment_type' in updated_fields
+        }
+
+        # masks and uniqueness, grouped by target type
+        by_type = {}
+        for i, equipment_type, serial_number in to_validate:
+            by_type.setdefault(equipment_type, []).append((i, serial_number))
+        for equipment_type, type_items in by_type.items():
+            serial_number_mask = compile_serial_number_mask(
+                equipment_type.serial_number_mask
+            )
+            existing = _get_existing_serial_numbers(
+                equipment_type, [sn for _, sn in type_items]
+            )
+            seen = set()
+            for i, serial_number in type_items:
+                try:
+                    sn_errors = serial_number_mask.get_errors(serial_number)
+                except ValidationError as e:
+                    sn_errors = e.detail
+                if not sn_errors \
+                        and (equipment_type.pk, serial_number) in released:
+                    sn_errors = ["This serial number is given up by another "
+                                 "item of this request, change it in a "
+                                 "separate request."]
+                elif not sn_errors and (serial_number in existing
+                                        or serial_number in seen):
+                    sn_errors = ["This serial number already exists "
+                                 "for this equipment type."]
+                seen.add(serial_number)
+                if sn_errors:
+                    errors.append(_item_error(i, serial_number, sn_errors))
+
+        if errors:
+            _raise_items_errors(sorted(errors, key=lambda e: e["index"]))
+
+        now = timezone.now()
+        count_deltas = {}
+        fields = {'updated_at'}
+        changed = []
+        for equipment, updated_fields in changes:
+            if not updated_fields:
+                continue
+            if 'equipment_type' in updated_fields:
+                old_type_id = equipment.equipment_type_id
+                new_type_id = updated_fields['equipment_type'].pk
+                count_deltas[old_type_id] = \
+                    count_deltas.get(old_type_id, 0) - 1
+                count_deltas[new_type_id] = \
+                    count_deltas.get(new_type_id, 0) + 1
+            for field, value in updated_fields.items():
+                setattr(equipment, field, value)
+            equipment.updated_at = now
+            fields.update(updated_fields)
+            changed.append(equipment)
+
+        if changed:
+            try:
+                with transaction.atomic():
+                    Equipment.objects.bulk_update(
+                        changed, sorted(fields),
+                        batch_size=SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE
+                    )
+                    _adjust_counts(count_deltas)
+                    if count_deltas:
+                        # created counts are grouped by the current type
+                        invalidate_equipment_stats()
+                    invalidate_equipment_caches()
+                    for equipment in changed:
+                        serial_number_index.add(
+                            equipment.equipment_type_id,
+                            [equipment.serial_number]
+                        )
+            except IntegrityError:
+                # unique constraint caught a concurrent write
+                serial_number_index.invalidate()
+                _raise_items_errors([_item_error(
+                    0, "", "Some serial numbers were changed concurrently, "
+                           "retry the request"
+                )])
+
+    return [equipment_by_id[item_id] for item_id in ids]
+
+
+def bulk_soft_delete_equipment(ids) -> int:
+    """Soft deletes multiple Equipment objects with UPDATE ... WHERE id IN.
+    Nothing is deleted if any id is not found among active equipment.
+
+    :param list ids:
+
+    Returns:
+        int: number of deleted objects
+
+    Raises:
+        rest_framework.exceptions.ValidationError with error dict
+        "serial_numbers_errors": list of errors with index of the id
+    """
+    from equipment_app.models import Equipment  # fix circular import
+
+    ids = _get_ids(ids)
+    with transaction.atomic():
+        # lock the rows so concurrent deletes can't skew type counts
+        type_id_by_id = _lock_active_equipment_types(ids)
+        errors = [
+            _item_error(i, "", ["Equipment not found"])
+            for i, item_id in enumerate(ids)
+            if item_id not in type_id_by_id
+        ]
+        if errors:
+            _raise_items_errors(errors)
+
+        now = timezone.now()
+        for start in range(0, len(ids), SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE):
+            Equipment.objects.filter(
+                pk__in=ids[start:start + SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE]
+            ).update(is_deleted=True, updated_at=now)
+
+        count_deltas = {}
+        for type_id in type_id_by_id.values():
+            count_deltas[type_id] = count_deltas.get(type_id, 0) - 1
+        _adjust_counts(count_deltas)
+        invalidate_equipment_caches()
+    return len(ids)
@@ -0,0 +1,245 @@
+import codecs
+import csv
+import json
+
+from django.db import IntegrityError, transaction
+from django.utils.html import escape
+from rest_framework.exceptions import ValidationError
+
+from equipment_app.cache import invalidate_equipment_caches
+from .equipment import _adjust_active_equipment_count, \
+    _get_existing_serial_numbers, _set_bulk_inserted_pks
+from .serial_index import serial_number_index
+from .serial_mask import compile_serial_number_mask
+
+
+def read_csv_rows(lines):
+    """
+    Lazily reads equipment rows from CSV lines (bytes).
+    Header row is required: equipment_type,serial_number[,notes]
+
+    :param Iterable[bytes] lines:
+
+    Yields:
+        dict: row
+    """
+    reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+    for row in reader:
+        yield row
+
+
+def read_ndjson_rows(lines):
+    """
+    Lazily reads equipment rows from NDJSON lines (bytes).
+    Blank lines are skipped, malformed lines are yielded as None
+
+    :param Iterable[bytes] lines:
+
+    Yields:
+        (dict | None): row
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def _row_error(index, serial_number, error):
+    return {
+        "index": index,
+        "serial_number": serial_number,
+        "status": "error",
+        "error": error
+    }
+
+
+def _prepare_import_row(index, row, equipment_types):
+    """Validates a single row without touching equipment table
+
+    :param int index:
+    :param (dict | None) row:
+    :param dict equipment_types: EquipmentType cache by id
+
+    Returns:
+        tuple: (Equipment | None, error dict | None)
+    """
+    # fix circular imports
+    from equipment_app.models import Equipment, EquipmentType
+
+    if row is None:
+        return None, _row_error(index, "", ["Malformed row"])
+
+    serial_number = row.get('serial_number')
+    if not isinstance(serial_number, str) or not serial_number:
+        return None, _row_error(
+            index, "", ["Serial number is required and must be a string"]
+        )
+
+    equipment_type_id = row.get('equipment_type')
+    try:
+        equipment_type_id = int(equipment_type_id)
+    except (TypeError, ValueError):
+        return None, _row_error(
+            index, serial_number,
+            ["Invalid value for equipment_type, must be correct id(int)"]
+        )
+
+    if equipment_type_id not in equipment_types:
+        equipment_types[equipment_type_id] = EquipmentType.objects.filter(
+            pk=equipment_type_id
+        ).first()
+    equipment_type = equipment_types[equipment_type_id]
+    if equipment_type is None:
+        return None, _row_error(
+            index, serial_number, ["Equipment type not found"]
+        )
+
+    try:
+        sn_errors = compile_serial_number_mask(
+            equipment_type.serial_number_mask
+        ).get_errors(serial_number)
+    except ValidationError as e:
+        sn_errors = e.detail
+    if sn_errors:
+        return None, _row_error(index, serial_number, sn_errors)
+
+    # XSS injection protection
+    notes = escape(row.get('notes') or '')
+    return Equipment(
+        equipment_type=equipment_type,
+        serial_number=serial_number,
+        notes=notes
+    ), None
+
+
+def _insert_equipment(equipments):
+    """Inserts equipment and adjusts type counts inside a savepoint
+
+    :param list equipments: list of Equipment
+
+    Raises:
+        django.db.IntegrityError: nothing of the batch is inserted
+    """
+    from equipment_app.models import Equipment  # fix circular import
+
+    with transaction.atomic():
+        created = Equipment.objects.bulk_create(equipments)
+        created_by_type = {}
+        for equipment in created:
+            created_by_type.setdefault(
+                equipment.equipment_type, []
+            ).append(equipment)
+        for equipment_type, type_equipments in sorted(
+                created_by_type.items(), key=lambda item: item[0].pk
+        ):
+            if type_equipments[0].pk is None:
+                _set_bulk_inserted_pks(equipment_type, type_equipments)
+            _adjust_active_equipment_count(
+                equipment_type.pk, len(type_equipments)
+            )
+            serial_number_index.add(
+                equipment_type.pk,
+                [equipment.serial_number for equipment in type_equipments]
+            )
+
+
+def _import_batch(batch):
+    """Checks collisions for the batch and inserts it inside a savepoint.
+    If a concurrent insert takes some serial numbers after the check, the
+    batch is retried row by row so only the colliding rows fail.
+
+    :param list batch: list of (index, Equipment)
+
+    Returns:
+        list: per-row result dicts ordered by index
+    """
+    serial_numbers_by_type = {}
+    for _, equipment in batch:
+        serial_numbers_by_type.setdefault(
+            equipment.equipment_type, []
+        ).append(equipment.serial_number)
+    existing = {
+        (equipment_type.pk, serial_number)
+        for equipment_type, serial_numbers in serial_numbers_by_type.items()
+        for serial_number in _get_existing_serial_numbers(
+            equipment_type, serial_numbers
+        )
+    }
+
+    results = []
+    to_create = []
+    for index, equipment in batch:
+        key = (equipment.equipment_type.pk, equipment.serial_number)
+        if key in existing:
+            results.append(_row_error(
+                index, equipment.serial_number,
+                ["This serial number already exists for this equipment type"]
+            ))
+            continue
+        # later duplicates inside the import collide with the first one
+        existing.add(key)
+        to_create.append((index, equipment))
+
+    created = []
+    try:
+        _insert_equipment([equipment for _, equipment in to_create])
+        created = to_create
+    except IntegrityError:
+        serial_number_index.invalidate()
+        for index, equipment in to_create:
+            equipment.pk = None
+            try:
+                _insert_equipment([equipment])
+            except IntegrityError:
+                results.append(_row_error(
+                    index, equipment.serial_number,
+                    ["This serial number already exists "
+                     "for this equipment type"]
+                ))
+            else:
+                created.append((index, equipment))
+    if created:
+        invalidate_equipment_caches()
+    results.extend({
+        "index": index,
+        "serial_number": equipment.serial_number,
+        "status": "created",
+        "id": equipment.pk
+    } for index, equipment in created)
+
+    return sorted(results, key=lambda result: result["index"])
+
+
+def import_equipment_rows(rows, batch_size):
+    """
+    Validates and inserts equipment rows in batches. Rows are consumed
+    lazily so memory usage is bounded by batch_size, not by input size.
+    Rows failing validation are reported right away, the rest are
+    reported when their batch is flushed.
+
+    :param Iterable[dict | None] rows:
+    :param int batch_size:
+
+    Yields:
+        dict: per-row result with "index", "serial_number", "status"
+        and either "id" or "error"
+    """
+    equipment_types = {}
+    batch = []
+    for index, row in enumerate(rows):
+        equipment, error = _prepare_import_row(index, row, equipment_types)
+        if error:
+            yield error
+            continue
+
+        batch.append((index, equipment))
+        if len(batch) >= batch_size:
+            yield from _import_batch(batch)
+            batch = []
+
+    if batch:
+        yield from _import_batch(batch)
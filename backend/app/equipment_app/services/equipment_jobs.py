@@ -0,0 +1,249 @@
+import datetime
+import os
+import socket
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .equipment_import import _import_batch, _prepare_import_row
+
+
+class JobOwnershipLost(Exception):
+    """The job was reclaimed by another worker (missed heartbeats)"""
+
+
+def get_worker_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _raise_job_error(error):
+    raise ValidationError(detail={
+        "serial_numbers_errors": [{
+            "index": 0,
+            "serial_number": "",
+            "error": error
+        }]
+    })
+
+
+def submit_equipment_create_job(equipment_type_id, serial_numbers, notes="",
+                                user=None):
+    """Queues bulk create. Only the request shape is checked here, serial
+    numbers are validated by the worker and reported per index.
+
+    :param str equipment_type_id:
+    :param list serial_numbers:
+    :param str notes:
+    :param user: job owner, User or TokenUser of the request
+
+    Returns:
+        EquipmentCreateJob: pending job
+
+    Raises:
+        rest_framework.exceptions.ValidationError with error dict
+        "serial_numbers_errors"
+    """
+    # fix circular imports
+    from equipment_app.models import EquipmentCreateJob, EquipmentType
+
+    if not equipment_type_id or not serial_numbers \
+            or not isinstance(serial_numbers, list):
+        _raise_job_error("Equipment type and serial numbers are required")
+    if len(serial_numbers) > settings.EQUIPMENT_JOB_MAX_SERIAL_NUMBERS:
+        _raise_job_error(
+            f"At most {settings.EQUIPMENT_JOB_MAX_SERIAL_NUMBERS} "
+            f"serial numbers per job"
+        )
+    try:
+        if not EquipmentType.objects.filter(pk=equipment_type_id).exists():
+            _raise_job_error("Equipment type not found")
+    except (TypeError, ValueError):
+        _raise_job_error(
+            "Invalid value for equipment_type, must be correct id(int)"
+        )
+
+    return EquipmentCreateJob.objects.create(
+        equipment_type_id=int(equipment_type_id),
+        serial_numbers=serial_numbers,
+        notes=notes if isinstance(notes, str) else '',
+        created_by_id=user.pk if user is not None
+        and user.is_authenticated else None,
+        total=len(serial_numbers),
+    )
+
+
+def claim_next_job(worker_id):
+    """
+    Takes the oldest pending job, or a running one whose worker stopped
+    sending heartbeats for EQUIPMENT_JOB_STALE_TIMEOUT seconds. SKIP
+    LOCKED lets concurrent workers claim different jobs without waiting.
+
+    :param str worker_id:
+
+    Returns:
+        (EquipmentCreateJob | None): claimed job
+    """
+    from equipment_app.models import EquipmentCreateJob  # fix circular import
+
+    now = timezone.now()
+    stale_before = now - datetime.timedelta(
+        seconds=settings.EQUIPMENT_JOB_STALE_TIMEOUT
+    )
+    with transaction.atomic():
+        job = (
+            EquipmentCreateJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status=EquipmentCreateJob.STATUS_PENDING)
+                    | Q(status=EquipmentCreateJob.STATUS_RUNNING,
+                        heartbeat_at__lt=stale_before))
+            .defer('serial_numbers')
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = EquipmentCreateJob.STATUS_RUNNING
+        job.worker = worker_id
+        job.heartbeat_at = now
+        job.started_at = job.started_at or now
+        job.attempts += 1
+        job.save(update_fields=['status', 'worker', 'heartbeat_at',
+                                'started_at', 'attempts'])
+    return job
+
+
+def _process_chunk(job_id, worker_id, serial_numbers, chunk_size) -> bool:
+    """
+    Creates the next chunk of the job and records its progress in one
+    transaction.
+
+    :param int job_id:
+    :param str worker_id:
+    :param list serial_numbers: all serial numbers of the job
+    :param int chunk_size:
+
+    Returns:
+        bool: True when the job has no serial numbers left
+
+    Raises:
+        JobOwnershipLost
+    """
+    # fix circular imports
+    from equipment_app.models import EquipmentCreateJob, \
+        EquipmentCreateJobError
+
+    with transaction.atomic():
+        # the row lock keeps a worker that reclaimed the job out until
+        # this chunk commits
+        job = (
+            EquipmentCreateJob.objects
+            .select_for_update()
+            .filter(pk=job_id, worker=worker_id,
+                    status=EquipmentCreateJob.STATUS_RUNNING)
+            .values('equipment_type_id', 'notes', 'processed', 'total')
+            .first()
+        )
+        if job is None:
+            raise JobOwnershipLost(job_id)
+        start = job['processed']
+        end = min(start + chunk_size, job['total'])
+
+        equipment_types = {}
+        errors = []
+        batch = []
+        for index in range(start, end):
+            equipment, error = _prepare_import_row(index, {
+                'equipment_type': job['equipment_type_id'],
+                'serial_number': serial_numbers[index],
+                'notes': job['notes'],
+            }, equipment_types)
+            if error:
+                errors.append(error)
+            else:
+                batch.append((index, equipment))
+        created = 0
+        for result in _import_batch(batch) if batch else []:
+            if result['status'] == 'created':
+                created += 1
+            else:
+                errors.append(result)
+
+        EquipmentCreateJobError.objects.bulk_create([
+            EquipmentCreateJobError(
+                job_id=job_id, index=error['index'],
+                serial_number=error['serial_number'] or '',
+                error=error['error']
+            ) for error in errors
+        ])
+        done = end >= job['total']
+        updates = {
+            'processed': end,
+            'created': F('created') + created,
+            'errors_count': F('errors_count') + len(errors),
+            'heartbeat_at': timezone.now(),
+        }
+        if done:
+            updates.update(status=EquipmentCreateJob.STATUS_COMPLETED,
+                           finished_at=timezone.now(), worker='')
+        EquipmentCreateJob.objects.filter(pk=job_id).update(**updates)
+    return done
+
+
+def process_job(job, worker_id, chunk_size=None, should_stop=None):
+    """
+    Runs the claimed job chunk by chunk. Between chunks the worker may be
+    asked to stop, the job is then released for another worker.
+
+    :param EquipmentCreateJob job: job claimed by this worker
+    :param str worker_id:
+    :param (int | None) chunk_size: defaults to EQUIPMENT_JOB_CHUNK_SIZE
+    :param (Callable[[], bool] | None) should_stop:
+
+    Returns:
+        str: status of the job when the worker let it go
+    """
+    from equipment_app.models import EquipmentCreateJob  # fix circular import
+
+    chunk_size = chunk_size or settings.EQUIPMENT_JOB_CHUNK_SIZE
+    owned = EquipmentCreateJob.objects.filter(pk=job.pk, worker=worker_id)
+    try:
+        # loaded once, chunks only read their slice
+        serial_numbers = EquipmentCreateJob.objects.filter(
+            pk=job.pk
+        ).values_list('serial_numbers', flat=True).get()
+        while not _process_chunk(job.pk, worker_id, serial_numbers,
+                                 chunk_size):
+            if should_stop is not None and should_stop():
+                owned.update(status=EquipmentCreateJob.STATUS_PENDING,
+                             worker='')
+                return EquipmentCreateJob.STATUS_PENDING
+    except JobOwnershipLost:
+        return EquipmentCreateJob.STATUS_RUNNING
+    except Exception as e:
+        owned.update(status=EquipmentCreateJob.STATUS_FAILED,
+                     failure=f'{type(e).__name__}: {e}',
+                     finished_at=timezone.now(), worker='')
+        raise
+    return EquipmentCreateJob.STATUS_COMPLETED
+
+
+def get_job_errors(job, after=-1, limit=None) -> list:
+    """Per-index errors of the job ordered by index
+
+    :param EquipmentCreateJob job:
+    :param int after: only errors with a greater index
+    :param (int | None) limit: defaults to EQUIPMENT_JOB_ERRORS_PAGE_SIZE
+
+    Returns:
+        list: error dicts
+    """
+    return list(
+        job.item_errors
+        .filter(index__gt=after)
+        .order_by('index')
+        .values('index', 'serial_number', 'error')
+        [:limit or settings.EQUIPMENT_JOB_ERRORS_PAGE_SIZE]
+    )
@@ -0,0 +1,195 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from equipment_app.cache import get_equipment_stats_version
+
+STATS_PERIODS = ('day', 'week', 'month')
+STATS_DEFAULT_PERIODS = 30
+STATS_MAX_PERIODS = 400
+
+
+def get_period_start(day, period) -> datetime.date:
+    """Returns first day of the period containing day (weeks start on
+    Monday, like SQL week truncation)"""
+    if period == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def get_next_period_start(start, period) -> datetime.date:
+    if period == 'week':
+        return start + datetime.timedelta(days=7)
+    if period == 'month':
+        return (start.replace(day=28)
+                + datetime.timedelta(days=4)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValidationError(detail={
+            name: ["Invalid date, expected YYYY-MM-DD"]
+        })
+
+
+def _start_of_day(day) -> datetime.datetime:
+    return timezone.make_aware(
+        datetime.datetime.combine(day, datetime.time.min)
+    )
+
+
+def _count_by_period(queryset, field, period, start, end):
+    """Counts rows with `field` in [start, end) per (period, type) with
+    SQL date truncation
+
+    Yields:
+        tuple: (period start date, equipment type id, count)
+    """
+    start_at = _start_of_day(start)
+    end_at = _start_of_day(end)
+    yield from (
+        queryset
+        .filter(**{f'{field}__gte': start_at, f'{field}__lt': end_at})
+        .order_by()
+        .annotate(period_start=Trunc(field, period,
+                                     output_field=DateField()))
+        .values('period_start', 'equipment_type')
+        .annotate(count=Count('id'))
+        .values_list('period_start', 'equipment_type', 'count')
+    )
+
+
+def _get_period_counts(period, starts) -> dict:
+    """
+    Returns {period start: {type id: [created, deleted]}}. Periods that
+    ended more than EQUIPMENT_STATS_CLOSE_DELAY seconds ago can't change
+    any more and are cached without expiry: a transaction that stamped
+    created_at/updated_at before the end of the period has committed by
+    then. The rest is computed with one query per counter over the range
+    of uncached periods.
+    """
+    from equipment_app.models import Equipment  # fix circular import
+
+    closed_before = timezone.now() - datetime.timedelta(
+        seconds=settings.EQUIPMENT_STATS_CLOSE_DELAY
+    )
+    version = get_equipment_stats_version()
+    keys = {
+        start: f'equipment_stats:{version}:{period}:{start.isoformat()}'
+        for start in starts
+        if _start_of_day(get_next_period_start(start, period))
+        <= closed_before
+    }
+    cached = cache.get_many(list(keys.values()))
+    counts = {start: cached[key] for start, key in keys.items()
+              if key in cached}
+
+    missing = [start for start in starts if start not in counts]
+    if not missing:
+        return counts
+
+    computed = {start: {} for start in missing}
+    end = get_next_period_start(missing[-1], period)
+    for i, (field, queryset) in enumerate([
+        ('created_at', Equipment.objects.all()),
+        # soft delete sets updated_at, deleted rows are never updated again
+        ('updated_at', Equipment.objects.filter(is_deleted=True)),
+    ]):
+        for start, type_id, count in _count_by_period(
+                queryset, field, period, missing[0], end
+        ):
+            if start in computed:
+                computed[start].setdefault(type_id, [0, 0])[i] = count
+
+    cache.set_many({keys[start]: computed[start]
+                    for start in missing if start in keys}, timeout=None)
+    counts.update(computed)
+    return counts
+
+
+def get_equipment_stats(period='day', date_from=None, date_to=None,
+                        equipment_type_id=None) -> dict:
+    """
+    Counts of created and soft-deleted equipment per type and period.
+
+    :param str period: day, week or month
+    :param (str | None) date_from: YYYY-MM-DD, defaults to 30 periods back
+    :param (str | None) date_to: YYYY-MM-DD, defaults to today
+    :param (str | int | None) equipment_type_id: only this type
+
+    Returns:
+        dict: "period", "date_from", "date_to" and "results": list of
+        {"period_start", "equipment_type", "equipment_type_name",
+        "created", "deleted"} ordered by period and type, periods and
+        types without changes are omitted
+
+    Raises:
+        rest_framework.exceptions.ValidationError
+    """
+    from equipment_app.models import EquipmentType  # fix circular import
+
+    if period not in STATS_PERIODS:
+        raise ValidationError(detail={
+            "period": [f"Must be one of: {', '.join(STATS_PERIODS)}"]
+        })
+    date_to = _parse_date(date_to, 'date_to') if date_to \
+        else timezone.localdate()
+    if date_from:
+        date_from = _parse_date(date_from, 'date_from')
+    else:
+        date_from = get_period_start(date_to, period)
+        for _ in range(STATS_DEFAULT_PERIODS - 1):
+            date_from = get_period_start(
+                date_from - datetime.timedelta(days=1), period
+            )
+    if date_from > date_to:
+        raise ValidationError(detail={
+            "date_from": ["Must not be after date_to"]
+        })
+    if equipment_type_id is not None:
+        try:
+            equipment_type_id = int(equipment_type_id)
+        except (TypeError, ValueError):
+            raise ValidationError(detail={
+                "equipment_type": ["Must be correct id(int)"]
+            })
+
+    starts = [get_period_start(date_from, period)]
+    while get_next_period_start(starts[-1], period) <= date_to:
+        if len(starts) >= STATS_MAX_PERIODS:
+            raise ValidationError(detail={
+                "date_from": [f"At most {STATS_MAX_PERIODS} periods "
+                              f"per request"]
+            })
+        starts.append(get_next_period_start(starts[-1], period))
+
+    counts = _get_period_counts(period, starts)
+    type_names = dict(EquipmentType.objects.values_list('id', 'name'))
+    results = []
+    for start in starts:
+        for type_id, (created, deleted) in sorted(counts[start].items()):
+            if equipment_type_id is not None and type_id != equipment_type_id:
+                continue
+            results.append({
+                "period_start": start,
+                "equipment_type": type_id,
+                "equipment_type_name": type_names.get(type_id),
+                "created": created,
+                "deleted": deleted,
+            })
+    return {
+        "period": period,
+        "date_from": date_from,
+        "date_to": date_to,
+        "results": results,
+    }
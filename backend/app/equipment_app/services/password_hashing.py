@@ -0,0 +1,99 @@
+import contextlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from equipment_app.cache import is_shared_cache
+
+# a shared slot of a killed worker frees itself after this many seconds
+SLOT_TIMEOUT = 30
+POLL_INTERVAL = 0.05
+
+_local_slots = None
+_local_slots_lock = threading.Lock()
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-in attempts at once, try again later.'
+    default_code = 'password_hashing_busy'
+
+
+def _get_local_slots(concurrency):
+    """Returns the semaphore of this process, recreated when the
+    configured concurrency changes"""
+    global _local_slots
+    with _local_slots_lock:
+        if _local_slots is None or _local_slots[0] != concurrency:
+            _local_slots = (concurrency,
+                            threading.BoundedSemaphore(concurrency))
+        return _local_slots[1]
+
+
+def _slot_key(index):
+    return f'password_hash_slot:{index}'
+
+
+def _acquire_shared_slot(concurrency):
+    """Returns key of a taken shared slot or None when all are busy"""
+    start = random.randrange(concurrency)
+    for i in range(concurrency):
+        key = _slot_key((start + i) % concurrency)
+        # add() is atomic, only one request gets a free slot
+        if cache.add(key, True, SLOT_TIMEOUT):
+            return key
+    return None
+
+
+@contextlib.contextmanager
+def _shared_slot(deadline):
+    concurrency = settings.PASSWORD_HASH_GLOBAL_CONCURRENCY
+    if concurrency <= 0 or not is_shared_cache():
+        yield
+        return
+
+    key = _acquire_shared_slot(concurrency)
+    while key is None:
+        if time.monotonic() >= deadline:
+            raise PasswordHashingBusy()
+        time.sleep(POLL_INTERVAL)
+        key = _acquire_shared_slot(concurrency)
+    try:
+        yield
+    finally:
+        cache.delete(key)
+
+
+@contextlib.contextmanager
+def password_hashing_slot():
+    """
+    Bounds password hashes (authenticate, create_user) running at once so
+    a burst of sign-ins can't take every thread's CPU from the API:
+    PASSWORD_HASH_CONCURRENCY threads per process (gunicorn threads, ASGI
+    thread pool) and, with a shared cache, PASSWORD_HASH_GLOBAL_CONCURRENCY
+    across all processes. Waits up to PASSWORD_HASH_WAIT_TIMEOUT seconds
+    for a free slot.
+
+    Raises:
+        PasswordHashingBusy: no free slot in time
+    """
+    concurrency = settings.PASSWORD_HASH_CONCURRENCY
+    if concurrency <= 0:
+        yield
+        return
+
+    timeout = settings.PASSWORD_HASH_WAIT_TIMEOUT
+    deadline = time.monotonic() + timeout
+    local_slots = _get_local_slots(concurrency)
+    if not local_slots.acquire(timeout=timeout):
+        raise PasswordHashingBusy()
+    try:
+        with _shared_slot(deadline):
+            yield
+    finally:
+        local_slots.release()
@@ -0,0 +1,208 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+
+
+class BloomFilter:
+    """
+    Probabilistic set: `in` never gives false negatives, false positives
+    happen with roughly error_rate probability while len <= capacity.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.size = max(8, math.ceil(
+            -self.capacity * math.log(error_rate) / math.log(2) ** 2
+        ))
+        self.hash_count = max(1, round(self.size / self.capacity
+                                       * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def __len__(self):
+        return self.count
+
+
+class SerialNumberIndex:
+    """
+    In-process Bloom filters of active serial numbers per equipment type.
+    A miss means the serial number definitely doesn't exist (as of the
+    last rebuild plus local writes) and the database query can be skipped,
+    a hit has to be confirmed by the database.
+
+    Filters are rebuilt after SERIAL_NUMBER_INDEX_TTL seconds or once they
+    outgrow their capacity. Serial numbers created by other processes or
+    outside the service layer are unknown until then; the unique constraint
+    on active (equipment_type, serial_number) still rejects them.
+
+    A rebuild reads the serial numbers without holding the lock, other
+    threads keep using the old filter meanwhile (or the database, if there
+    is none yet). Serial numbers added during the rebuild are replayed into
+    the new filter when it is swapped in.
+    """
+
+    def __init__(self):
+        self._filters = {}
+        # serial numbers added while a rebuild of the type is in progress
+        self._rebuilds = {}
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._filters.clear()
+            self._rebuilds.clear()
+            self._stats = {
+                'lookups': 0,
+                # definite negatives, database query skipped
+                'skipped': 0,
+                # possible hits sent to the database
+                'checked': 0,
+                # possible hits the database confirmed
+                'confirmed': 0,
+                'rebuilds': 0,
+            }
+
+    @property
+    def enabled(self):
+        return settings.SERIAL_NUMBER_INDEX_ENABLED
+
+    def _build(self, equipment_type_id):
+        from equipment_app.models import Equipment  # fix circular import
+
+        queryset = Equipment.objects.filter(
+            equipment_type_id=equipment_type_id, is_deleted=False
+        ).order_by().values_list('serial_number', flat=True)
+        serial_numbers = list(queryset.iterator(chunk_size=10000))
+        bloom = BloomFilter(
+            max(len(serial_numbers) * 2, 1024),
+            settings.SERIAL_NUMBER_INDEX_ERROR_RATE
+        )
+        for serial_number in serial_numbers:
+            bloom.add(serial_number)
+        return bloom, time.monotonic() + settings.SERIAL_NUMBER_INDEX_TTL
+
+    def _get_filter(self, equipment_type_id):
+        """Returns the filter of the type, None while the first one is
+        being built by another thread"""
+        with self._lock:
+            entry = self._filters.get(equipment_type_id)
+            if entry is not None and entry[1] >= time.monotonic() \
+                    and len(entry[0]) <= entry[0].capacity:
+                return entry[0]
+            if equipment_type_id in self._rebuilds:
+                # stale filter still has no false negatives for
+                # serial numbers written by this process
+                return entry[0] if entry is not None else None
+            added = self._rebuilds[equipment_type_id] = []
+
+        try:
+            bloom, expires_at = self._build(equipment_type_id)
+        except BaseException:
+            with self._lock:
+                if self._rebuilds.get(equipment_type_id) is added:
+                    del self._rebuilds[equipment_type_id]
+            raise
+
+        with self._lock:
+            if self._rebuilds.get(equipment_type_id) is not added:
+                # invalidated during the rebuild, the data read may be stale
+                return None
+            del self._rebuilds[equipment_type_id]
+            for serial_number in added:
+                bloom.add(serial_number)
+            self._filters[equipment_type_id] = (bloom, expires_at)
+            self._stats['rebuilds'] += 1
+        return bloom
+
+    def possible_matches(self, equipment_type_id, serial_numbers):
+        """
+        Returns the serial numbers that may exist and need a database check
+
+        :param int equipment_type_id:
+        :param list serial_numbers: unique serial numbers
+
+        Returns:
+            list: candidates, all of serial_numbers if the index is disabled
+        """
+        if not self.enabled:
+            return list(serial_numbers)
+        bloom = self._get_filter(equipment_type_id)
+        if bloom is None:
+            return list(serial_numbers)
+        candidates = [sn for sn in serial_numbers if sn in bloom]
+        with self._lock:
+            self._stats['lookups'] += len(serial_numbers)
+            self._stats['skipped'] += len(serial_numbers) - len(candidates)
+            self._stats['checked'] += len(candidates)
+        return candidates
+
+    def record_confirmed(self, count):
+        if self.enabled:
+            with self._lock:
+                self._stats['confirmed'] += count
+
+    def add(self, equipment_type_id, serial_numbers):
+        """
+        Registers serial numbers written by this process. Safe to call
+        before commit: rolled back serial numbers only cost a false positive
+        """
+        with self._lock:
+            entry = self._filters.get(equipment_type_id)
+            if entry is not None:
+                for serial_number in serial_numbers:
+                    entry[0].add(serial_number)
+            if equipment_type_id in self._rebuilds:
+                self._rebuilds[equipment_type_id].extend(serial_numbers)
+
+    def invalidate(self, equipment_type_id=None):
+        """Drops filters so they are rebuilt on next lookup"""
+        with self._lock:
+            if equipment_type_id is None:
+                self._filters.clear()
+                self._rebuilds.clear()
+            else:
+                self._filters.pop(equipment_type_id, None)
+                self._rebuilds.pop(equipment_type_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            filters = {
+                type_id: len(bloom)
+                for type_id, (bloom, _) in self._filters.items()
+            }
+        checked = stats['checked']
+        stats['false_positives'] = checked - stats['confirmed']
+        stats['skip_ratio'] = (
+            round(stats['skipped'] / stats['lookups'], 4)
+            if stats['lookups'] else None
+        )
+        stats['false_positive_ratio'] = (
+            round(stats['false_positives'] / checked, 4) if checked else None
+        )
+        stats['filters'] = filters
+        return stats
+
+
+serial_number_index = SerialNumberIndex()
@@ -0,0 +1,91 @@
+import re
+from functools import lru_cache
+
+from rest_framework.exceptions import ValidationError
+
+MASK_CHAR_PATTERNS = {
+    'N': '[0-9]',
+    'A': '[A-Z]',
+    'a': '[a-z]',
+    'X': '[A-Z0-9]',
+    'Z': '[-_@]',
+}
+
+MASK_CHAR_ERROR_MESSAGES = {
+    'N': "must be a digit (0-9)",
+    'A': "must be an uppercase letter",
+    'a': "must be a lowercase letter",
+    'X': "must be an uppercase letter or digit",
+    'Z': "must be one of: -, _, @",
+}
+
+COMPILED_MASKS_CACHE_SIZE = 256
+
+
+class CompiledSerialNumberMask:
+    """
+    Serial number mask compiled into a single whole-string regex.
+    Per-position diagnostics are only computed when the fast check fails.
+    """
+
+    def __init__(self, mask):
+        self.mask = mask
+        self.length = len(mask)
+        self.unknown_char_error = None
+        self.pattern = None
+        self.char_patterns = []
+
+        for i, mask_char in enumerate(mask):
+            if mask_char not in MASK_CHAR_PATTERNS:
+                self.unknown_char_error = (
+                    f"Unknown mask character '{mask_char}' "
+                    f"at position {i + 1}"
+                )
+                return
+            self.char_patterns.append(
+                re.compile(MASK_CHAR_PATTERNS[mask_char])
+            )
+
+        self.pattern = re.compile(
+            ''.join(MASK_CHAR_PATTERNS[mask_char] for mask_char in mask)
+        )
+
+    def get_errors(self, serial_number) -> list:
+        """
+        Validates a serial number against the mask.
+
+        :param str serial_number:
+
+        Returns:
+            list: list of errors
+
+        Raises:
+            rest_framework.exceptions.ValidationError if mask is invalid
+        """
+        sn_len = len(serial_number)
+        if sn_len != self.length:
+            return [
+                f"Serial number must be {self.length} "
+                f"characters long, current length: {sn_len}"
+            ]
+
+        if self.unknown_char_error:
+            raise ValidationError(self.unknown_char_error)
+
+        if self.pattern.fullmatch(serial_number):
+            return []
+
+        return [
+            f"Character at position {i + 1} "
+            f"{MASK_CHAR_ERROR_MESSAGES[mask_char]}"
+            for i, (char, mask_char, char_pattern) in enumerate(
+                zip(serial_number, self.mask, self.char_patterns)
+            )
+            if not char_pattern.fullmatch(char)
+        ]
+
+
+@lru_cache(maxsize=COMPILED_MASKS_CACHE_SIZE)
+def compile_serial_number_mask(mask) -> CompiledSerialNumberMask:
+    """Returns compiled mask, memoized per mask string"""
+    return CompiledSerialNumberMask(mask)
@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _jti_key(jti):
+    return f'jwt_denylist:jti:{jti}'
+
+
+def _user_key(user_id):
+    return f'jwt_denylist:user:{user_id}'
+
+
+def revoke_token(token):
+    """Denies the token until it expires
+
+    :param rest_framework_simplejwt.tokens.Token token:
+    """
+    if not settings.JWT_DENYLIST_ENABLED:
+        return
+    timeout = int(token['exp'] - time.time()) + 1
+    if timeout > 0:
+        cache.set(_jti_key(token[api_settings.JTI_CLAIM]), True, timeout)
+
+
+def revoke_user_tokens(user_id):
+    """Denies all tokens of the user issued up to now, once the current
+    transaction commits
+
+    :param user_id:
+    """
+    if not settings.JWT_DENYLIST_ENABLED:
+        return
+
+    def revoke():
+        # refresh tokens live longest, older tokens are expired anyway
+        timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+        cache.set(_user_key(user_id), time.time(), timeout)
+
+    transaction.on_commit(revoke)
+
+
+def is_token_revoked(token) -> bool:
+    """Checks the token and its user against the denylist with a single
+    cache round trip
+
+    :param rest_framework_simplejwt.tokens.Token token:
+    """
+    if not settings.JWT_DENYLIST_ENABLED:
+        return False
+    jti_key = _jti_key(token.get(api_settings.JTI_CLAIM))
+    user_key = _user_key(token.get(api_settings.USER_ID_CLAIM))
+    denied = cache.get_many([jti_key, user_key])
+    if denied.get(jti_key):
+        return True
+    revoked_at = denied.get(user_key)
+    # "iat" of tokens issued by UserSnapshotRefreshToken has fractions of
+    # a second, older tokens issued in the second of revocation are denied
+    return revoked_at is not None and token.get('iat', 0) < revoked_at
@@ -1,24 +1,40 @@
 from django.contrib.auth.models import User
-from django.db import IntegrityError, DataError
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import IntegrityError, DataError, transaction
+
+from equipment_app.services.password_hashing import password_hashing_slot
+
+
+class UsernameTakenError(ValueError):
+    pass
 
 
 def register_user(username, password, email=None) -> User:
-    if User.objects.filter(username=username).exists():
-        raise ValueError('Username already exists')
+    """
+    Creates user, the unique username constraint rejects duplicates
+    without a separate existence query.
+
+    Raises:
+        UsernameTakenError: username already exists
+        ValueError: data doesn't fit the columns
+        PasswordHashingBusy: too many password hashes in progress
+    """
     try:
-        user = User.objects.create_user(
-            username=username, password=password, email=email
-        )
+        with password_hashing_slot(), transaction.atomic():
+            user = User.objects.create_user(
+                username=username, password=password, email=email
+            )
     except IntegrityError:
-        raise ValueError('Username already exists')
+        raise UsernameTakenError('Username already exists')
     except DataError as e:
         raise ValueError(str(e))
     return user
 
 
 def generate_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    # fix circular import
+    from equipment_app.authentication import UserSnapshotRefreshToken
+
+    refresh = UserSnapshotRefreshToken.for_user(user)
     return {
         'access_token': str(refresh.access_token),
         'refresh_token': str(refresh),
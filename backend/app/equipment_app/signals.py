@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import USER_SNAPSHOT_CLAIMS, get_cached_user_key
+from .cache import invalidate_equipment_caches, invalidate_equipment_stats
+from .db_stats import connection_stats
+from .models import EquipmentType
+from .services.token_denylist import revoke_user_tokens
+
+USER_TOKEN_FIELDS = (*USER_SNAPSHOT_CLAIMS, 'password')
+
+
+@receiver([post_save, post_delete], sender=EquipmentType)
+def equipment_type_changed(sender, **kwargs):
+    """Equipment types are edited outside the service layer (admin,
+    fixtures), drop cached lists that include them"""
+    invalidate_equipment_caches()
+
+
+@receiver(post_delete, sender=EquipmentType)
+def equipment_type_deleted(sender, **kwargs):
+    """Equipment of the type is hard deleted with it"""
+    invalidate_equipment_stats()
+
+
+@receiver(request_started)
+def count_request(sender, **kwargs):
+    connection_stats.request_started()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    if connection.alias == 'default':
+        connection_stats.connection_created()
+
+
+@receiver(pre_save, sender=User)
+def revoke_changed_user_tokens(sender, instance, update_fields=None,
+                               **kwargs):
+    """Tokens carry a snapshot of the user, revoke them when it changes
+    or the password does"""
+    if instance.pk is None or (update_fields is not None and not set(
+            update_fields) & set(USER_TOKEN_FIELDS)):
+        return
+    stored = User.objects.filter(pk=instance.pk).values(
+        *USER_TOKEN_FIELDS
+    ).first()
+    if stored and any(stored[field] != getattr(instance, field)
+                      for field in USER_TOKEN_FIELDS):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    cache.delete(get_cached_user_key(instance.pk))
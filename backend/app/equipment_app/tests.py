@@ -1,3 +1,1366 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import re
+import tempfile
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .api_benchmarks import BenchmarkContext, run_scenario
+from .benchmarks import _legacy_get_serial_numbers_errors, \
+    _legacy_search_q
+from .cache import get_equipment_version
+from .db_stats import connection_stats
+from .metrics import request_metrics
+from .models import DataVersion, Equipment, EquipmentCreateJob, \
+    EquipmentType
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+from .search import equipment_search_q
+from .services import equipment as equipment_services
+from .services import equipment_import as import_services
+from .services.equipment import _get_serial_numbers_errors, \
+    _validate_and_prepare_bulk_equipment, reconcile_active_equipment_counts, \
+    soft_delete_equipment, update_equipment
+from .services.equipment_jobs import claim_next_job, process_job
+from .services.password_hashing import PasswordHashingBusy, \
+    password_hashing_slot
+from .services.serial_index import SerialNumberIndex, serial_number_index
+from .services.user import generate_tokens_for_user
+
+
+class SerialNumberMaskTests(TestCase):
+    def test_errors_match_per_character_validation(self):
+        mask = 'NAaXZXN'
+        for serial_number in ['1Ab9-Z0', '1Ab9-Z', 'aaaaaaa', '1aB_@z!',
+                              '0Zz0_00', '']:
+            self.assertEqual(
+                _get_serial_numbers_errors(serial_number, mask),
+                _legacy_get_serial_numbers_errors(serial_number, mask)
+            )
+
+    def test_unknown_mask_character(self):
+        with self.assertRaises(ValidationError):
+            _get_serial_numbers_errors('123', 'NQN')
+        self.assertEqual(len(_get_serial_numbers_errors('12', 'NQN')), 1)
+
+
+class BulkEquipmentValidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.equipment_type = EquipmentType.objects.create(
+            name='Router', serial_number_mask='XXAAAAAXAA'
+        )
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+
+    @override_settings(SERIAL_NUMBER_INDEX_ENABLED=False)
+    def test_existing_serial_numbers_lookup_is_chunked(self):
+        Equipment.objects.create(
+            equipment_type=self.equipment_type, serial_number='0QABCDE1ZZ'
+        )
+        serial_numbers = ['0QABCDE1ZZ'] + [
+            f'{i:02d}ABCDE1ZZ' for i in range(10, 60)
+        ]
+        with mock.patch.object(equipment_services,
+                               'SERIAL_NUMBERS_LOOKUP_CHUNK_SIZE', 20):
+            with self.assertNumQueries(3):
+                with self.assertRaises(ValidationError) as cm:
+                    _validate_and_prepare_bulk_equipment(
+                        self.equipment_type, serial_numbers
+                    )
+
+        errors = cm.exception.detail['serial_numbers_errors']
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['index'], '0')
+        self.assertEqual(errors[0]['serial_number'], '0QABCDE1ZZ')
+
+    def test_serial_number_index_skips_definite_misses(self):
+        Equipment.objects.create(
+            equipment_type=self.equipment_type, serial_number='0QABCDE1ZZ'
+        )
+        serial_numbers = ['0QABCDE1ZZ'] + [
+            f'{i:02d}ABCDE1ZZ' for i in range(10, 60)
+        ]
+        # index build and a single candidate lookup
+        with self.assertNumQueries(2):
+            with self.assertRaises(ValidationError):
+                _validate_and_prepare_bulk_equipment(
+                    self.equipment_type, serial_numbers
+                )
+        # index is warm: only the candidate lookup is left
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError):
+                _validate_and_prepare_bulk_equipment(
+                    self.equipment_type, serial_numbers
+                )
+        stats = serial_number_index.stats()
+        self.assertEqual(stats['lookups'], 102)
+        self.assertEqual(stats['confirmed'], 2)
+        self.assertGreaterEqual(stats['skipped'], 90)
+
+    def test_serial_numbers_added_during_rebuild_are_kept(self):
+        index = SerialNumberIndex()
+        build = index._build
+
+        def build_with_concurrent_write(equipment_type_id):
+            built = build(equipment_type_id)
+            # another thread creates a serial number after the read,
+            # it can take the lock as the read doesn't hold it
+            index.add(equipment_type_id, ['9QABCDE1ZZ'])
+            return built
+
+        type_id = self.equipment_type.pk
+        with mock.patch.object(index, '_build',
+                               side_effect=build_with_concurrent_write):
+            self.assertEqual(
+                index.possible_matches(type_id,
+                                       ['9QABCDE1ZZ', '8QABCDE1ZZ']),
+                ['9QABCDE1ZZ']
+            )
+        self.assertEqual(index.stats()['rebuilds'], 1)
+
+        index.invalidate(type_id)
+        self.assertEqual(index.possible_matches(type_id, ['9QABCDE1ZZ']), [])
+
+    def test_duplicates_reported_with_real_indexes(self):
+        with self.assertRaises(ValidationError) as cm:
+            _validate_and_prepare_bulk_equipment(
+                self.equipment_type,
+                ['0QABCDE1ZZ', '1QABCDE1ZZ', '0QABCDE1ZZ', '1QABCDE1ZZ',
+                 '2QABCDE1ZZ', '0QABCDE1ZZ']
+            )
+        errors = cm.exception.detail['serial_numbers_errors']
+        self.assertEqual(
+            [(int(e['index']), e['serial_number']) for e in errors],
+            [(0, '0QABCDE1ZZ'), (1, '1QABCDE1ZZ'), (2, '0QABCDE1ZZ'),
+             (3, '1QABCDE1ZZ'), (5, '0QABCDE1ZZ')]
+        )
+
+    def test_database_enforces_active_serial_number_uniqueness(self):
+        for _ in range(2):
+            Equipment.objects.create(
+                equipment_type=self.equipment_type,
+                serial_number='0QABCDE1ZZ', is_deleted=True
+            )
+        Equipment.objects.create(
+            equipment_type=self.equipment_type, serial_number='0QABCDE1ZZ'
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Equipment.objects.create(
+                equipment_type=self.equipment_type,
+                serial_number='0QABCDE1ZZ'
+            )
+
+    def test_soft_deleted_serial_numbers_are_not_collisions(self):
+        Equipment.objects.create(
+            equipment_type=self.equipment_type, serial_number='0QABCDE1ZZ',
+            is_deleted=True
+        )
+        objects = _validate_and_prepare_bulk_equipment(
+            self.equipment_type, ['0QABCDE1ZZ']
+        )
+        self.assertEqual(len(objects), 1)
+
+
+class EquipmentCreateTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.equipment_type = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN'
+        )
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def _create(self, serial_numbers):
+        return self.client.post('/api/equipment/', {
+            'equipment_type': self.equipment_type.pk,
+            'serial_numbers': serial_numbers,
+        }, format='json')
+
+    def test_create_query_count_does_not_grow_with_batch(self):
+        # type lookup, serial number index build (first time only),
+        # INSERT and type count UPDATE wrapped in a savepoint
+        for serial_numbers, num_queries in [
+            (['0001'], 6),
+            ([f'{i:04d}' for i in range(10, 110)], 5),
+        ]:
+            with self.assertNumQueries(num_queries):
+                response = self._create(serial_numbers)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(
+                [item['serial_number'] for item in response.data],
+                serial_numbers
+            )
+            self.assertTrue(all(item['id'] for item in response.data))
+
+    def test_create_ignores_soft_deleted_rows(self):
+        deleted = Equipment.objects.create(
+            equipment_type=self.equipment_type, serial_number='0001',
+            is_deleted=True
+        )
+        response = self._create(['0001'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 1)
+        self.assertNotEqual(response.data[0]['id'], deleted.pk)
+
+
+class ActiveEquipmentCountTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.switch = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN'
+        )
+        cls.router = EquipmentType.objects.create(
+            name='Router', serial_number_mask='NNNN'
+        )
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def _counts(self):
+        return dict(EquipmentType.objects.values_list(
+            'name', 'active_equipment_count'
+        ))
+
+    def test_count_follows_service_writes(self):
+        response = self.client.post('/api/equipment/', {
+            'equipment_type': self.switch.pk,
+            'serial_numbers': ['0001', '0002', '0003'],
+        }, format='json')
+        first_id, second_id = response.data[0]['id'], response.data[1]['id']
+        self.assertEqual(self._counts(), {'Switch': 3, 'Router': 0})
+
+        self.client.patch(f'/api/equipment/{first_id}/',
+                          {'equipment_type': self.router.pk}, format='json')
+        self.assertEqual(self._counts(), {'Switch': 2, 'Router': 1})
+
+        self.client.delete(f'/api/equipment/{second_id}/')
+        self.assertEqual(self._counts(), {'Switch': 1, 'Router': 1})
+
+        response = self.client.get('/api/equipment-type/')
+        self.assertEqual(
+            [item['equipment_count'] for item in response.data['results']],
+            [1, 1]
+        )
+
+    def test_soft_delete_is_single_idempotent_update(self):
+        equipment = Equipment.objects.create(equipment_type=self.switch,
+                                             serial_number='0001')
+        self.switch.active_equipment_count = 1
+        self.switch.save()
+        # savepoint, equipment UPDATE, type count UPDATE, release
+        with self.assertNumQueries(4):
+            self.assertTrue(soft_delete_equipment(equipment.pk))
+        self.assertFalse(soft_delete_equipment(equipment.pk))
+        self.assertEqual(self._counts(), {'Switch': 0, 'Router': 0})
+        response = self.client.delete(f'/api/equipment/{equipment.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_update_writes_only_changed_columns(self):
+        equipment = Equipment.objects.create(equipment_type=self.switch,
+                                             serial_number='0001')
+        with CaptureQueriesContext(connection) as queries:
+            update_equipment(equipment, None, None, 'moved')
+        update_sql = next(q['sql'] for q in queries
+                          if q['sql'].startswith('UPDATE'))
+        self.assertIn('"notes"', update_sql)
+        self.assertIn('"updated_at"', update_sql)
+        self.assertNotIn('"serial_number"', update_sql)
+        self.assertNotIn('"is_deleted"', update_sql)
+
+    def test_reconcile_fixes_drift(self):
+        Equipment.objects.create(equipment_type=self.switch,
+                                 serial_number='0001')
+        EquipmentType.objects.filter(pk=self.router.pk).update(
+            active_equipment_count=5
+        )
+        drift = reconcile_active_equipment_counts()
+        self.assertEqual(drift, {self.switch.pk: (0, 1),
+                                 self.router.pk: (5, 0)})
+        self.assertEqual(self._counts(), {'Switch': 1, 'Router': 0})
+        self.assertEqual(reconcile_active_equipment_counts(), {})
+
+
+class EquipmentImportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.equipment_type = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNAA'
+        )
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def _import(self, body, content_type, batch_size=2):
+        response = self.client.generic(
+            'POST', f'/api/equipment/import/?batch_size={batch_size}',
+            body, content_type=content_type
+        )
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in
+                b''.join(response.streaming_content).splitlines()]
+
+    def test_csv_import(self):
+        type_id = self.equipment_type.pk
+        body = (
+            'equipment_type,serial_number,notes\n'
+            f'{type_id},12AB,first\n'
+            f'{type_id},12A,short\n'
+            f'{type_id},34CD,\n'
+            f'{type_id},12AB,duplicate\n'
+            f'{type_id},56EF,\n'
+        )
+        results = self._import(body, 'text/csv')
+        self.assertEqual(results[-1], {'summary': {'created': 3, 'errors': 2}})
+        statuses = {r['index']: r['status'] for r in results[:-1]}
+        self.assertEqual(statuses, {0: 'created', 1: 'error', 2: 'created',
+                                    3: 'error', 4: 'created'})
+        self.assertEqual(
+            Equipment.objects.active().filter(
+                equipment_type=self.equipment_type
+            ).count(), 3
+        )
+
+    def test_ndjson_import_reports_malformed_rows(self):
+        type_id = self.equipment_type.pk
+        body = (
+            json.dumps({'equipment_type': type_id, 'serial_number': '12AB'})
+            + '\n{not json\n\n'
+            + json.dumps({'equipment_type': 0, 'serial_number': '34CD'})
+        )
+        results = self._import(body, 'application/x-ndjson')
+        self.assertEqual(results[-1], {'summary': {'created': 1, 'errors': 2}})
+        errors = {r['index']: r['error'] for r in results
+                  if r.get('status') == 'error'}
+        self.assertEqual(errors, {1: ['Malformed row'],
+                                  2: ['Equipment type not found']})
+
+    def test_concurrent_insert_fails_only_colliding_rows(self):
+        Equipment.objects.create(equipment_type=self.equipment_type,
+                                 serial_number='34CD')
+        type_id = self.equipment_type.pk
+        body = ''.join(
+            json.dumps({'equipment_type': type_id, 'serial_number': sn})
+            + '\n' for sn in ['12AB', '34CD', '56EF']
+        )
+        # the row appears after the collision check, as if inserted
+        # by a concurrent import
+        with mock.patch.object(import_services,
+                               '_get_existing_serial_numbers',
+                               return_value=set()):
+            results = self._import(body, 'application/x-ndjson',
+                                   batch_size=3)
+
+        self.assertEqual(results[-1], {'summary': {'created': 2, 'errors': 1}})
+        self.assertEqual(
+            [(r['serial_number'], r['status']) for r in results[:-1]],
+            [('12AB', 'created'), ('34CD', 'error'), ('56EF', 'created')]
+        )
+        self.assertEqual(
+            EquipmentType.objects.get(pk=type_id).active_equipment_count, 2
+        )
+
+
+class EquipmentListPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.equipment_type = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN'
+        )
+        Equipment.objects.bulk_create(
+            Equipment(equipment_type=cls.equipment_type,
+                      serial_number=f'{i:04d}', is_deleted=i % 5 == 0)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pagination_walks_filtered_list_without_count(self):
+        url = '/api/equipment/?pagination=cursor&page_size=7' \
+              '&serial_number__contains=1'
+        serial_numbers = []
+        while url:
+            # data version and the page
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            serial_numbers += [item['serial_number']
+                               for item in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(serial_numbers, [
+            f'{i:04d}' for i in range(25) if i % 5 and '1' in f'{i:04d}'
+        ])
+
+    def test_search_matches_serial_notes_and_type_name(self):
+        other_type = EquipmentType.objects.create(
+            name='Router 12', serial_number_mask='NNNN'
+        )
+        routed = Equipment.objects.create(
+            equipment_type=other_type, serial_number='9999'
+        )
+        Equipment.objects.filter(serial_number='0003').update(
+            notes='spare unit 12'
+        )
+        response = self.client.get('/api/equipment/?search=12&page_size=100')
+        self.assertEqual(
+            [item['serial_number'] for item in response.data['results']],
+            ['0003', '0012', routed.serial_number]
+        )
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get('/api/equipment/')
+        self.assertEqual(response.data['count'], 20)
+
+    def test_count_is_cached_per_filter_and_invalidated_on_write(self):
+        url = '/api/equipment/?serial_number__contains=1'
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url + '&page=2&page_size=5')
+        self.assertEqual(response.data['count'], 10)
+        with self.assertNumQueries(3):
+            self.client.get('/api/equipment/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/equipment/', {
+                'equipment_type': self.equipment_type.pk,
+                'serial_numbers': ['1000'],
+            }, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 11)
+
+    def test_fast_list_serialization_output_is_identical(self):
+        Equipment.objects.filter(serial_number='0003').update(
+            notes='spare <b>unit</b>'
+        )
+        for url in ['/api/equipment/?page_size=7&page=2',
+                    '/api/equipment/?pagination=cursor&page_size=7',
+                    '/api/equipment/?search=03']:
+            cache.clear()
+            expected = self.client.get(url).content
+            cache.clear()
+            with override_settings(FAST_LIST_SERIALIZATION=True):
+                self.assertEqual(self.client.get(url).content, expected)
+
+    @override_settings(FAST_LIST_SERIALIZATION=True)
+    def test_fast_list_serialization_cursor_pages(self):
+        url = '/api/equipment/?pagination=cursor&page_size=7'
+        serial_numbers = []
+        while url:
+            response = self.client.get(url)
+            serial_numbers += [item['serial_number']
+                               for item in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(serial_numbers,
+                         [f'{i:04d}' for i in range(25) if i % 5])
+
+    def test_sparse_fieldset_trims_output_and_select(self):
+        url = '/api/equipment/?fields=id,serial_number&page_size=3'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['results'][0]),
+                         ['id', 'serial_number'])
+        type_table = EquipmentType._meta.db_table
+        select_sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn(type_table, select_sql)
+        self.assertNotIn('notes', select_sql)
+
+        cache.clear()
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            self.assertEqual(self.client.get(url).content, response.content)
+
+        url = '/api/equipment/?fields=equipment_type_name,id' \
+              '&pagination=cursor&page_size=3'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertIn(type_table, queries.captured_queries[-1]['sql'])
+        first = Equipment.objects.active().order_by('id').first()
+        self.assertEqual(response.data['results'][0],
+                         {'id': first.pk, 'equipment_type_name': 'Switch'})
+
+    def test_sparse_fieldset_unknown_field(self):
+        response = self.client.get('/api/equipment/?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['fields'],
+                         ['Unknown field: password'])
+
+
+@skipUnless(connection.vendor == 'mysql', 'FULLTEXT search is MySQL only')
+class FullTextSearchTests(TransactionTestCase):
+    """InnoDB FULLTEXT indexes only see committed rows, so the data is
+    committed instead of being rolled back with the test"""
+
+    def setUp(self):
+        switch = EquipmentType.objects.create(
+            name='Switch 12AB', serial_number_mask='XXXX'
+        )
+        router = EquipmentType.objects.create(
+            name='Router', serial_number_mask='XXXX'
+        )
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=router, serial_number='12AB'),
+            Equipment(equipment_type=router, serial_number='ab12',
+                      notes='rack ab12'),
+            Equipment(equipment_type=router, serial_number='zz12',
+                      notes='spare'),
+            Equipment(equipment_type=switch, serial_number='zzzz'),
+            Equipment(equipment_type=router, serial_number='12AC',
+                      is_deleted=True),
+        ])
+
+    def test_results_match_like_filtering(self):
+        queryset = Equipment.objects.active().order_by('id')
+        for term in ['12', '12AB', 'ab', 'rack', 'spare', 'Switch', 'zz']:
+            self.assertEqual(
+                list(queryset.filter(equipment_search_q(term))
+                     .values_list('serial_number', flat=True)),
+                list(queryset.filter(_legacy_search_q(term))
+                     .values_list('serial_number', flat=True)),
+                term
+            )
+
+    def test_text_match_uses_fulltext_index(self):
+        plan = Equipment.objects.active().filter(
+            equipment_search_q('12AB')
+        ).explain()
+        self.assertIn('equipment_search_ft', plan)
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.equipment_type = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN'
+        )
+        cls.equipment = Equipment.objects.create(
+            equipment_type=cls.equipment_type, serial_number='0001'
+        )
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_list_not_modified_until_write(self):
+        response = self.client.get('/api/equipment/')
+        etag = response['ETag']
+        # only the data version is read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/equipment/',
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/equipment/')
+        self.assertEqual(response.data['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/equipment/{self.equipment.pk}/')
+        response = self.client.get('/api/equipment/',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_list_invalidated_by_writes_of_other_processes(self):
+        etag = self.client.get('/api/equipment/')['ETag']
+        # a job worker or management command writes with its own cache,
+        # only the version row in the database is shared
+        Equipment.objects.filter(pk=self.equipment.pk).update(notes='moved')
+        DataVersion.objects.filter(pk='equipment').update(
+            version=F('version') + 1
+        )
+        response = self.client.get('/api/equipment/',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['notes'], 'moved')
+
+    def test_retrieve_not_modified_until_update(self):
+        url = f'/api/equipment/{self.equipment.pk}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.patch(url, {'notes': 'moved'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['notes'], 'moved')
+
+    def test_retrieve_modified_by_type_rename(self):
+        url = f'/api/equipment/{self.equipment.pk}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        # a second later, Last-Modified has a resolution of seconds
+        EquipmentType.objects.filter(pk=self.equipment_type.pk).update(
+            name='Renamed',
+            updated_at=timezone.now() + datetime.timedelta(seconds=1)
+        )
+        for headers in [{'HTTP_IF_NONE_MATCH': etag},
+                        {'HTTP_IF_MODIFIED_SINCE': last_modified}]:
+            response = self.client.get(url, **headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['equipment_type_name'],
+                             'Renamed')
+
+
+class EquipmentBulkTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.switch = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN',
+            active_equipment_count=3
+        )
+        cls.router = EquipmentType.objects.create(
+            name='Router', serial_number_mask='AAAA'
+        )
+        cls.items = [
+            Equipment.objects.create(equipment_type=cls.switch,
+                                     serial_number=f'000{i}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_update(self):
+        first, second, third = self.items
+        response = self.client.patch('/api/equipment/bulk/', [
+            {'id': first.pk, 'notes': 'rack 1'},
+            {'id': second.pk, 'equipment_type': self.router.pk,
+             'serial_number': 'ABCD'},
+            {'id': third.pk, 'serial_number': '0009'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(item['equipment_type_name'], item['serial_number'],
+              item['notes']) for item in response.data],
+            [('Switch', '0000', 'rack 1'), ('Router', 'ABCD', None),
+             ('Switch', '0009', None)]
+        )
+        self.assertEqual(
+            dict(EquipmentType.objects.values_list(
+                'name', 'active_equipment_count'
+            )),
+            {'Switch': 2, 'Router': 1}
+        )
+
+    def test_bulk_update_reports_item_errors(self):
+        first, second, third = self.items
+        response = self.client.patch('/api/equipment/bulk/', [
+            {'id': first.pk, 'serial_number': '0002'},
+            {'id': second.pk, 'serial_number': 'ABCD'},
+            {'id': 0, 'notes': 'missing'},
+            {'id': third.pk, 'equipment_type': self.router.pk},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['serial_numbers_errors']
+        self.assertEqual([int(e['index']) for e in errors], [0, 1, 2, 3])
+        self.assertEqual(Equipment.objects.get(pk=first.pk).serial_number,
+                         '0000')
+
+    def test_bulk_update_rejects_taking_released_serial_numbers(self):
+        first, second, third = self.items
+        response = self.client.patch('/api/equipment/bulk/', [
+            {'id': first.pk, 'serial_number': '0001'},
+            {'id': second.pk, 'serial_number': '0000'},
+            {'id': third.pk, 'serial_number': '0001'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['serial_numbers_errors']
+        self.assertEqual([int(e['index']) for e in errors], [0, 1, 2])
+        self.assertTrue(all('given up by another item' in str(e['error'])
+                            for e in errors))
+        self.assertEqual(
+            list(Equipment.objects.order_by('pk').values_list(
+                'serial_number', flat=True
+            )),
+            ['0000', '0001', '0002']
+        )
+
+    def test_type_ids_parsed_like_single_update(self):
+        first, second, third = self.items
+        response = self.client.patch(f'/api/equipment/{first.pk}/', {
+            'equipment_type': str(self.router.pk), 'serial_number': 'ABCD'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch('/api/equipment/bulk/', [
+            {'id': second.pk, 'equipment_type': str(self.router.pk),
+             'serial_number': 'BCDE'},
+            {'id': third.pk, 'equipment_type': str(self.switch.pk)},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['equipment_type_name'] for item in response.data],
+            ['Router', 'Switch']
+        )
+
+        for equipment_type in ['router', True, [self.router.pk]]:
+            response = self.client.patch(f'/api/equipment/{third.pk}/', {
+                'equipment_type': equipment_type
+            }, format='json')
+            self.assertEqual(response.status_code, 400)
+            response = self.client.patch('/api/equipment/bulk/', [
+                {'id': third.pk, 'equipment_type': equipment_type},
+            ], format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Invalid value for equipment_type',
+                          str(response.data['serial_numbers_errors']))
+
+    def test_bulk_delete(self):
+        ids = [item.pk for item in self.items[:2]]
+        with self.assertNumQueries(5) as queries:
+            response = self.client.post('/api/equipment/bulk-delete/',
+                                        {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 204)
+        # rows are locked reading only their ids and type ids
+        lock_sql = next(q['sql'] for q in queries.captured_queries
+                        if q['sql'].startswith('SELECT'))
+        self.assertNotIn('notes', lock_sql)
+        self.assertNotIn('serial_number_mask', lock_sql)
+        self.assertEqual(
+            list(Equipment.objects.active().values_list('pk', flat=True)),
+            [self.items[2].pk]
+        )
+        self.assertEqual(
+            EquipmentType.objects.get(pk=self.switch.pk)
+            .active_equipment_count, 1
+        )
+
+        response = self.client.post('/api/equipment/bulk-delete/',
+                                    {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['serial_numbers_errors']), 2)
+
+
+class ORJSONRendererParserTests(TestCase):
+    data = {
+        'id': 1,
+        'created_at': datetime.datetime(2025, 1, 2, 3, 4, 5, 678,
+                                        tzinfo=datetime.timezone.utc),
+        'local': timezone.make_aware(datetime.datetime(2025, 1, 2, 3, 4),
+                                     datetime.timezone(
+                                         datetime.timedelta(hours=3))),
+        'date': datetime.date(2025, 1, 2),
+        'price': Decimal('12.50'),
+        'duration': datetime.timedelta(minutes=1, seconds=30),
+        'label': gettext_lazy('Equipment'),
+        'filters': {1: 10, 2: 20},
+        'notes': 'line\u2028separator, unicode: ключ',
+        'items': [None, True, 1.5, ['nested']],
+    }
+
+    def test_render_matches_json_renderer(self):
+        for media_type in [None, 'application/json; indent=2',
+                           'application/json; indent=4']:
+            self.assertEqual(
+                ORJSONRenderer().render(self.data, media_type),
+                JSONRenderer().render(self.data, media_type)
+            )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_floats_rendered_like_json_renderer(self):
+        data = {'size': 1e16, 'items': [{'ratio': 1e-7}], 1.5: 'key'}
+        self.assertEqual(ORJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+        for value in [float('nan'), float('inf')]:
+            with self.assertRaisesMessage(ValueError, 'not JSON compliant'):
+                ORJSONRenderer().render({'items': [{'ratio': value}]})
+
+    def test_parse_matches_json_parser(self):
+        body = json.dumps({'serial_numbers': ['AB12', 'ключ'],
+                           'equipment_type': 1}).encode()
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)),
+                         JSONParser().parse(io.BytesIO(body)))
+        for invalid in [b'{"a": NaN}', b'{"a": ']:
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(invalid))
+
+
+class AsyncEquipmentViewsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.equipment_type = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN'
+        )
+        Equipment.objects.bulk_create(
+            Equipment(equipment_type=cls.equipment_type,
+                      serial_number=f'{i:04d}', is_deleted=i % 5 == 0)
+            for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.headers = {'Authorization': 'Bearer ' + generate_tokens_for_user(
+            self.user
+        )['access_token']}
+
+    async def test_list_matches_sync_list(self):
+        self.client.force_authenticate(self.user)
+        for query in ['?page=2&page_size=7', '?serial_number__contains=1',
+                      '?fields=id,equipment_type_name&page=last',
+                      '?search=swi', '?search=12',
+                      '?pagination=cursor&page_size=7',
+                      '?pagination=cursor&page_size=7&cursor=cD0xMA%3D%3D',
+                      '?pagination=cursor&fields=id&cursor=cj0xJnA9MTI%3D']:
+            expected = await sync_to_async(self.client.get)(
+                '/api/equipment/' + query
+            )
+            response = await self.async_client.get(
+                '/api/async/equipment/' + query, headers=self.headers
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response.content.replace(b'/async/', b'/'),
+                expected.content
+            )
+
+        response = await self.async_client.get(
+            '/api/async/equipment/?page=9', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 404)
+
+    async def test_conditional_get(self):
+        response = await self.async_client.get(
+            '/api/async/equipment/?page_size=5', headers=self.headers
+        )
+        etag = response.headers['ETag']
+        response = await self.async_client.get(
+            '/api/async/equipment/?page_size=5',
+            headers={**self.headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        equipment = await Equipment.objects.active().afirst()
+        url = f'/api/async/equipment/{equipment.pk}/'
+        response = await self.async_client.get(url, headers=self.headers)
+        self.assertIn('Last-Modified', response.headers)
+        response = await self.async_client.get(url, headers={
+            **self.headers, 'If-None-Match': response.headers['ETag']
+        })
+        self.assertEqual(response.status_code, 304)
+
+        # a write commits, in this or another process
+        await DataVersion.objects.filter(pk='equipment').aupdate(
+            version=F('version') + 1
+        )
+        response = await self.async_client.get(
+            '/api/async/equipment/?page_size=5',
+            headers={**self.headers, 'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_retrieve_and_authentication(self):
+        equipment = await Equipment.objects.active().afirst()
+        response = await self.async_client.get(
+            f'/api/async/equipment/{equipment.pk}/', headers=self.headers
+        )
+        self.assertEqual(response.json()['serial_number'],
+                         equipment.serial_number)
+
+        deleted = await Equipment.objects.filter(is_deleted=True).afirst()
+        response = await self.async_client.get(
+            f'/api/async/equipment/{deleted.pk}/', headers=self.headers
+        )
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.get('/api/async/equipment/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response.headers)
+
+
+class ConnectionStatsTests(APITestCase):
+    def test_stats_count_requests_and_connections(self):
+        admin = User.objects.create_superuser('admin', password='admin')
+        self.client.force_authenticate(admin)
+        connection_stats.clear()
+        # the test connection stays open, simulate a reconnect
+        connection_created.send(sender=type(connection),
+                                connection=connection)
+        self.client.get('/api/equipment/')
+        self.client.get('/api/equipment/')
+        self.client.get('/api/equipment/')
+
+        response = self.client.get('/api/stats/db-connections/')
+        self.assertEqual(response.data['requests'], 4)
+        self.assertEqual(response.data['connections'], 1)
+        self.assertEqual(response.data['reuse_ratio'], 0.75)
+
+        self.client.force_authenticate(
+            User.objects.create_user('tester', password='tester')
+        )
+        response = self.client.get('/api/stats/db-connections/')
+        self.assertEqual(response.status_code, 403)
+
+
+class StatelessJWTAuthenticationTests(APITestCase):
+    url = '/api/stats/db-connections/'
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', password='admin')
+
+    def authorize(self, access_token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    def test_snapshot_token_needs_no_user_query(self):
+        tokens = generate_tokens_for_user(self.admin)
+        self.authorize(tokens['access_token'])
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/user/logout',
+                             {'refresh': tokens['refresh_token']},
+                             format='json')
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        response = self.client.post('/api/token/refresh/', {
+            'refresh': tokens['refresh_token']
+        }, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_user_changes_revoke_tokens(self):
+        self.authorize(generate_tokens_for_user(self.admin)['access_token'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.email = 'admin@example.com'
+            self.admin.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.is_staff = False
+            self.admin.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_tokens_issued_right_after_revocation_are_valid(self):
+        # e.g. authenticate() upgrading the password hash before the
+        # tokens are issued in the same second
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.set_password('admin')
+            self.admin.save()
+        tokens = generate_tokens_for_user(self.admin)
+        self.authorize(tokens['access_token'])
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_token_without_snapshot_uses_cached_user(self):
+        self.authorize(RefreshToken.for_user(self.admin).access_token)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+
+class AuthThrottlingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user('alice', password='secret')
+
+    def login(self, username, password='wrong', ip='10.0.0.1'):
+        return self.client.post('/api/user/login', {
+            'username': username, 'password': password
+        }, format='json', REMOTE_ADDR=ip)
+
+    @override_settings(AUTH_THROTTLE_RATES={'login_username': '2/minute'})
+    def test_login_throttled_per_username_across_ips(self):
+        self.assertEqual(self.login('alice', ip='10.0.0.1').status_code, 401)
+        self.assertEqual(self.login('Alice', ip='10.0.0.2').status_code, 401)
+        response = self.login('alice', 'secret', ip='10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.login('bob', ip='10.0.0.3').status_code, 401)
+
+    @override_settings(AUTH_THROTTLE_RATES={'login_ip': '1/minute'})
+    def test_token_obtain_throttled_per_ip(self):
+        url = '/api/token/'
+        data = {'username': 'alice', 'password': 'secret'}
+        self.assertEqual(self.client.post(url, data).status_code, 200)
+        self.assertEqual(self.client.post(url, data).status_code, 429)
+        response = self.client.post(url, data, REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=1,
+                       PASSWORD_HASH_WAIT_TIMEOUT=0)
+    def test_busy_password_hashing_returns_503(self):
+        with password_hashing_slot():
+            with self.assertRaises(PasswordHashingBusy):
+                with password_hashing_slot():
+                    pass
+            response = self.login('alice', 'secret')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['detail'],
+                         PasswordHashingBusy.default_detail)
+        self.assertEqual(self.login('alice', 'secret').status_code, 200)
+
+    @override_settings(PASSWORD_HASH_CONCURRENCY=2,
+                       PASSWORD_HASH_GLOBAL_CONCURRENCY=1,
+                       PASSWORD_HASH_WAIT_TIMEOUT=0)
+    def test_global_limit_needs_shared_cache(self):
+        # per-process cache: only the local bound applies
+        with password_hashing_slot(), password_hashing_slot():
+            pass
+        self.assertEqual([error.id for error in run_checks()],
+                         ['equipment_app.E001'])
+
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }}
+        ):
+            self.assertEqual(run_checks(), [])
+            with password_hashing_slot():
+                with self.assertRaises(PasswordHashingBusy):
+                    with password_hashing_slot():
+                        pass
+
+    def test_register_duplicate_relies_on_unique_constraint(self):
+        # savepoint queries and the failing insert, no existence checks
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/user/register', {
+                'username': 'alice', 'password': 'x'
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(),
+                         {'username': ['Username already exists']})
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        request_metrics.clear()
+        self.client.force_authenticate(
+            User.objects.create_user('tester', password='tester')
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_per_view_action(self):
+        response = self.client.get('/api/equipment/')
+        self.assertRegex(response['Server-Timing'],
+                         r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        self.client.get('/api/equipment/?page=99')
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/metrics').status_code, 404)
+        response = self.client.get('/api/metrics',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        body = response.content.decode()
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
+        self.assertIn('http_request_duration_seconds_count'
+                      '{view="EquipmentViewSet.list",method="GET"} 2', body)
+        self.assertIn('db_queries_per_request_bucket'
+                      '{view="EquipmentViewSet.list",method="GET",le="+Inf"} 2',
+                      body)
+        self.assertIn('http_responses_total{view="EquipmentViewSet.list",'
+                      'method="GET",status="404"} 1', body)
+
+    async def test_queries_counted_under_asgi(self):
+        user = await User.objects.aget(username='tester')
+        headers = {'Authorization': 'Bearer ' + generate_tokens_for_user(
+            user
+        )['access_token']}
+        for url in ['/api/equipment/', '/api/async/equipment/']:
+            response = await self.async_client.get(url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            queries = int(re.search(r'desc="(\d+) queries"',
+                                    response['Server-Timing']).group(1))
+            self.assertGreater(queries, 0, url)
+
+
+class SeedAndApiBenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+
+    def test_seed_equipment_and_run_scenarios(self):
+        version = get_equipment_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('seed_equipment', count=60, types=3, batch_size=25,
+                         deleted_ratio=0, stdout=io.StringIO())
+        # other processes see the data version in the database
+        self.assertGreater(get_equipment_version(), version)
+        call_command('seed_equipment', count=30, types=3,
+                     deleted_ratio=0, stdout=io.StringIO())
+        equipment_types = EquipmentType.objects.filter(
+            name__startswith='seed-'
+        )
+        self.assertEqual(
+            sorted(equipment_types.values_list('active_equipment_count',
+                                               flat=True)),
+            [30, 30, 30]
+        )
+        for equipment in Equipment.objects.select_related('equipment_type'):
+            self.assertEqual(_get_serial_numbers_errors(
+                equipment.serial_number,
+                equipment.equipment_type.serial_number_mask
+            ), [])
+
+        ctx = BenchmarkContext(bulk_size=5)
+        for name in ['list', 'search', 'retrieve', 'bulk_create', 'delete']:
+            summary = run_scenario(ctx, name, iterations=3, warmup=0)
+            self.assertEqual(summary['errors'], 0, name)
+        ctx.cleanup()
+        self.assertFalse(Equipment.objects.filter(
+            equipment_type__name='api-benchmark'
+        ).exists())
+
+
+class EquipmentStatsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.switch = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN'
+        )
+        cls.router = EquipmentType.objects.create(
+            name='Router', serial_number_mask='NNNN'
+        )
+        at = lambda day: datetime.datetime(2025, 3, day, 12,
+                                           tzinfo=datetime.timezone.utc)
+        for i, (equipment_type, created, deleted) in enumerate([
+            (cls.switch, 3, None),   # Monday
+            (cls.switch, 4, 10),
+            (cls.router, 9, None),   # Sunday, same week
+            (cls.switch, 10, None),  # next week
+        ]):
+            equipment = Equipment.objects.create(
+                equipment_type=equipment_type, serial_number=f'{i:04d}',
+                is_deleted=deleted is not None
+            )
+            Equipment.objects.filter(pk=equipment.pk).update(
+                created_at=at(created), updated_at=at(deleted or created)
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_weekly_stats_and_closed_period_cache(self):
+        url = '/api/equipment/stats/?period=week' \
+              '&date_from=2025-03-01&date_to=2025-03-16'
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(str(r['period_start']), r['equipment_type_name'],
+              r['created'], r['deleted'])
+             for r in response.data['results']],
+            [('2025-03-03', 'Switch', 2, 0),
+             ('2025-03-03', 'Router', 1, 0),
+             ('2025-03-10', 'Switch', 1, 1)]
+        )
+        # all periods are closed and cached, only the stats version and
+        # type names are read
+        with self.assertNumQueries(2):
+            cached = self.client.get(url + f'&equipment_type={self.router.pk}')
+        self.assertEqual([r['created'] for r in cached.data['results']], [1])
+
+    @override_settings(EQUIPMENT_STATS_CLOSE_DELAY=2 * 24 * 3600)
+    def test_recently_ended_periods_are_not_cached(self):
+        today = timezone.localdate()
+        yesterday = today - datetime.timedelta(days=1)
+        url = f'/api/equipment/stats/?period=day' \
+              f'&date_from={yesterday}&date_to={yesterday}'
+        self.assertEqual(self.client.get(url).data['results'], [])
+        # stamped just before midnight, committed after it
+        equipment = Equipment.objects.create(equipment_type=self.switch,
+                                             serial_number='0099')
+        Equipment.objects.filter(pk=equipment.pk).update(
+            created_at=timezone.make_aware(
+                datetime.datetime.combine(today, datetime.time.min)
+            ) - datetime.timedelta(seconds=1)
+        )
+        response = self.client.get(url)
+        self.assertEqual([r['created'] for r in response.data['results']],
+                         [1])
+
+    def test_type_change_invalidates_closed_periods(self):
+        url = '/api/equipment/stats/?period=week' \
+              '&date_from=2025-03-01&date_to=2025-03-16'
+        self.client.get(url)
+        first, fourth = Equipment.objects.filter(
+            serial_number__in=['0000', '0003']
+        ).order_by('serial_number')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/equipment/{first.pk}/', {
+                'equipment_type': self.router.pk
+            }, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch('/api/equipment/bulk/', [
+                {'id': fourth.pk, 'equipment_type': self.router.pk}
+            ], format='json')
+        response = self.client.get(url)
+        self.assertEqual(
+            [(str(r['period_start']), r['equipment_type_name'],
+              r['created'], r['deleted'])
+             for r in response.data['results']],
+            [('2025-03-03', 'Switch', 1, 0),
+             ('2025-03-03', 'Router', 2, 0),
+             ('2025-03-10', 'Switch', 0, 1),
+             ('2025-03-10', 'Router', 1, 0)]
+        )
+
+    def test_monthly_stats_and_validation(self):
+        response = self.client.get('/api/equipment/stats/?period=month'
+                                   '&date_from=2025-02-15&date_to=2025-03-31')
+        self.assertEqual(
+            [(str(r['period_start']), r['created'])
+             for r in response.data['results']],
+            [('2025-03-01', 3), ('2025-03-01', 1)]
+        )
+        for query in ['period=year', 'date_from=2025-13-01',
+                      'date_from=2025-03-02&date_to=2025-03-01',
+                      'date_from=2000-01-01&date_to=2025-01-01']:
+            response = self.client.get('/api/equipment/stats/?' + query)
+            self.assertEqual(response.status_code, 400, query)
+
+
+class EquipmentCreateJobTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tester', password='tester')
+        cls.other = User.objects.create_user('other', password='other')
+        cls.switch = EquipmentType.objects.create(
+            name='Switch', serial_number_mask='NNNN'
+        )
+        Equipment.objects.create(equipment_type=cls.switch,
+                                 serial_number='0001')
+        cls.switch.active_equipment_count = 1
+        cls.switch.save()
+
+    def setUp(self):
+        cache.clear()
+        serial_number_index.clear()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, serial_numbers):
+        return self.client.post('/api/equipment/jobs/', {
+            'equipment_type': self.switch.pk,
+            'serial_numbers': serial_numbers,
+            'notes': '<b>bulk</b>',
+        }, format='json')
+
+    def test_job_is_queued_and_processed_in_chunks(self):
+        with self.assertNumQueries(2):
+            response = self.submit(
+                ['0002', '0001', 'bad', '0003', '0002', '0004']
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertFalse(Equipment.objects.filter(notes__contains='bulk'))
+        url = f'/api/equipment/jobs/{response.data["id"]}/'
+        self.assertTrue(response['Location'].endswith(url))
+
+        out = io.StringIO()
+        call_command('run_equipment_jobs', once=True, chunk_size=4,
+                     stdout=out)
+        self.assertIn('completed', out.getvalue())
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: response.data[key] for key in
+             ['status', 'total', 'processed', 'created', 'errors_count']},
+            {'status': 'completed', 'total': 6, 'processed': 6,
+             'created': 3, 'errors_count': 3}
+        )
+        self.assertEqual(
+            [(error['index'], error['serial_number'])
+             for error in response.data['errors']],
+            [(1, '0001'), (2, 'bad'), (4, '0002')]
+        )
+        response = self.client.get(url, {'errors_after': 1})
+        self.assertEqual([error['index'] for error in response.data['errors']],
+                         [2, 4])
+        self.assertEqual(
+            sorted(Equipment.objects.filter(notes='&lt;b&gt;bulk&lt;/b&gt;')
+                   .values_list('serial_number', flat=True)),
+            ['0002', '0003', '0004']
+        )
+        self.switch.refresh_from_db()
+        self.assertEqual(self.switch.active_equipment_count, 4)
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_submit_validates_request_shape(self):
+        response = self.client.post('/api/equipment/jobs/', {
+            'equipment_type': 999, 'serial_numbers': ['0002']
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['serial_numbers_errors'][0]['error'],
+            'Equipment type not found'
+        )
+        self.assertEqual(self.submit([]).status_code, 400)
+        self.assertFalse(EquipmentCreateJob.objects.exists())
+
+    @override_settings(EQUIPMENT_JOB_STALE_TIMEOUT=60)
+    def test_stale_job_is_resumed_by_another_worker(self):
+        job_id = self.submit(['0002', '0003', '0004']).data['id']
+        job = claim_next_job('worker-1')
+        self.assertEqual(
+            process_job(job, 'worker-1', chunk_size=1,
+                        should_stop=lambda: True),
+            'pending'
+        )
+        job = claim_next_job('worker-1')
+        # worker-1 dies after the claim, its heartbeat gets stale
+        self.assertIsNone(claim_next_job('worker-2'))
+        EquipmentCreateJob.objects.filter(pk=job_id).update(
+            heartbeat_at=timezone.now() - datetime.timedelta(seconds=61)
+        )
+        job = claim_next_job('worker-2')
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(process_job(job, 'worker-2', chunk_size=1),
+                         'completed')
+        # the old worker lost the job and doesn't touch it any more
+        self.assertEqual(process_job(job, 'worker-1'), 'running')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.created),
+                         ('completed', 3, 3))
@@ -0,0 +1,44 @@
+import hashlib
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class AuthRateThrottle(SimpleRateThrottle):
+    """
+    Throttle with the rate of its scope in settings.AUTH_THROTTLE_RATES,
+    read per request so rates can be changed without a reload. Empty rate
+    disables the throttle.
+    """
+
+    def get_rate(self):
+        return settings.AUTH_THROTTLE_RATES.get(self.scope) or None
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginIPThrottle(AuthRateThrottle):
+    scope = 'login_ip'
+
+
+class LoginUsernameThrottle(AuthRateThrottle):
+    """Limits attempts per username from any IP (credential stuffing
+    spread over many addresses)"""
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        username = data.get('username') if hasattr(data, 'get') else None
+        if not isinstance(username, str) or not username:
+            # invalid request, rejected by the serializer without a hash
+            return None
+        ident = hashlib.sha256(username.lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class RegisterIPThrottle(AuthRateThrottle):
+    scope = 'register_ip'
@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, \
     TokenRefreshView, TokenVerifyView
 
-from . import views
+from . import async_views, views
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
 
 router = DefaultRouter()
 router.register(r'equipment', views.EquipmentViewSet,
@@ -15,8 +16,24 @@ urlpatterns = [
     # ViewSet routes
     path('', include(router.urls)),
     
+    # Async read endpoints (ASGI deployments)
+    path('async/equipment/',
+         async_views.AsyncEquipmentListView.as_view(),
+         name='async_equipment_list'),
+    path('async/equipment/<int:pk>/',
+         async_views.AsyncEquipmentDetailView.as_view(),
+         name='async_equipment_detail'),
+
+    path('stats/db-connections/',
+         views.DatabaseConnectionStatsView.as_view(),
+         name='db_connection_stats'),
+
+    path('metrics', views.metrics_view, name='metrics'),
+
     # Authentication endpoints  
-    path('token/', TokenObtainPairView.as_view(),
+    path('token/', TokenObtainPairView.as_view(
+        throttle_classes=[LoginIPThrottle, LoginUsernameThrottle]
+    ),
          name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(),
          name='token_refresh'),
@@ -25,4 +42,5 @@ urlpatterns = [
     path('user/login', views.UserLoginView.as_view(), name='user_login'),
     path('user/register', views.UserRegisterView.as_view(),
          name='user_register'),
+    path('user/logout', views.UserLogoutView.as_view(), name='user_logout'),
 ]
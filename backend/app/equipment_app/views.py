@@ -1,21 +1,50 @@
+import hmac
+import json
+
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters, status, generics
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated, AllowAny, \
+    IsAdminUser
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
 
+from .db_stats import connection_stats
 from .filters import EquipmentFilter, EquipmentTypeFilter
-from .models import Equipment, EquipmentType
-from .pagination import StandardResultsSetPagination
-from .serializers import EquipmentSerializer, EquipmentTypeSerializer, \
-    UserLoginSerializer, UserRegisterSerializer
+from .metrics import request_metrics
+from .mixins import CachedListMixin, ConditionalRetrieveMixin, \
+    SparseFieldsetMixin, ValuesListMixin
+from .models import Equipment, EquipmentCreateJob, EquipmentType
+from .pagination import CachedCountPagination, OptionalCursorPagination
+from .parsers import CSVStreamParser, NDJSONStreamParser
+from .serializers import EquipmentCreateJobSerializer, \
+    EquipmentSerializer, EquipmentTypeSerializer, \
+    EquipmentValuesSerializer, UserLoginSerializer, UserRegisterSerializer
 from .services.equipment import create_equipment, soft_delete_equipment, \
     update_equipment
-from .services.user import register_user, generate_tokens_for_user
+from .services.equipment_bulk import bulk_soft_delete_equipment, \
+    bulk_update_equipment
+from .services.equipment_import import import_equipment_rows, \
+    read_csv_rows, read_ndjson_rows
+from .services.equipment_jobs import get_job_errors, \
+    submit_equipment_create_job
+from .services.equipment_stats import get_equipment_stats
+from .services.password_hashing import password_hashing_slot
+from .services.serial_index import serial_number_index
+from .services.token_denylist import revoke_token
+from .services.user import register_user, generate_tokens_for_user, \
+    UsernameTakenError
+from .throttling import LoginIPThrottle, LoginUsernameThrottle, \
+    RegisterIPThrottle
 
 
-class EquipmentTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class EquipmentTypeViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing equipment types.
     """
@@ -27,19 +56,32 @@ class EquipmentTypeViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_class = EquipmentTypeFilter
     search_fields = ['name', 'serial_number_mask']
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CachedCountPagination
 
 
-class EquipmentViewSet(viewsets.ModelViewSet):
+class EquipmentViewSet(CachedListMixin, SparseFieldsetMixin, ValuesListMixin,
+                       ConditionalRetrieveMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing equipment.
     """
     serializer_class = EquipmentSerializer
+    values_serializer_class = EquipmentValuesSerializer
+    sparse_fieldset_lookups = {
+        'id': 'id',
+        'equipment_type': 'equipment_type',
+        'equipment_type_name': 'equipment_type__name',
+        'serial_number': 'serial_number',
+        'notes': 'notes',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_class = EquipmentFilter
     ordering_fields = ['id', 'created_at', 'updated_at', 'serial_number']
-    pagination_class = StandardResultsSetPagination
+    pagination_class = OptionalCursorPagination
+    # the type name is part of the response
+    etag_related_fields = ('equipment_type',)
 
     def get_queryset(self):
         return (Equipment.objects
@@ -98,19 +140,194 @@ class EquipmentViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
-    def destroy(self, request, *args, **kwargs):
+    def destroy(self, request, pk=None, *args, **kwargs):
         """Safe delete"""
-        equipment = self.get_object()
-        soft_delete_equipment(equipment)
+        try:
+            deleted = soft_delete_equipment(int(pk))
+        except ValueError:
+            deleted = False
+        if not deleted:
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    def retrieve(self, request, pk=None, *args, **kwargs):
+    def get_retrieve_object(self):
         """
         Retrieve single equipment instance by ID.
         """
-        equipment = Equipment.objects.get_active_or_404(pk=pk)
-        serializer = self.get_serializer(equipment)
-        return Response(serializer.data)
+        return Equipment.objects.get_active_or_404(pk=self.kwargs['pk'])
+
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Update multiple equipment instances.
+        Body: list of objects with "id" and fields to change.
+        """
+        try:
+            equipment_list = bulk_update_equipment(request.data)
+        except ValidationError as e:
+            return Response(
+                {
+                    "serial_numbers_errors":
+                        e.detail.get("serial_numbers_errors", [])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result_serializer = self.get_serializer(equipment_list, many=True)
+        return Response(
+            result_serializer.data,
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request, *args, **kwargs):
+        """
+        Safe delete of multiple equipment instances.
+        Body: {"ids": [...]}
+        """
+        try:
+            ids = request.data.get('ids') \
+                if isinstance(request.data, dict) else None
+            bulk_soft_delete_equipment(ids)
+        except ValidationError as e:
+            return Response(
+                {
+                    "serial_numbers_errors":
+                        e.detail.get("serial_numbers_errors", [])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'], url_path='serial-index-stats',
+            permission_classes=[IsAdminUser], pagination_class=None)
+    def serial_index_stats(self, request, *args, **kwargs):
+        """
+        Hit/miss statistics of the serial number index in this worker.
+        """
+        return Response(serial_number_index.stats())
+
+    @action(detail=False, methods=['get'], url_path='stats',
+            pagination_class=None, filter_backends=[])
+    def stats(self, request, *args, **kwargs):
+        """
+        Created and soft-deleted equipment counts per type and period.
+        Query: period (day, week, month), date_from and date_to
+        (YYYY-MM-DD), equipment_type (id).
+        """
+        return Response(get_equipment_stats(
+            period=request.query_params.get('period', 'day'),
+            date_from=request.query_params.get('date_from'),
+            date_to=request.query_params.get('date_to'),
+            equipment_type_id=request.query_params.get('equipment_type'),
+        ))
+
+    @action(detail=False, methods=['post'], url_path='jobs',
+            serializer_class=EquipmentCreateJobSerializer,
+            pagination_class=None, filter_backends=[])
+    def create_job(self, request, *args, **kwargs):
+        """
+        Queues bulk create for the background workers.
+        Body: same as create with "serial_numbers". Responds 202 with the
+        job, poll /api/equipment/jobs/<id>/ for progress and errors.
+        """
+        try:
+            job = submit_equipment_create_job(
+                request.data.get('equipment_type'),
+                request.data.get('serial_numbers'),
+                request.data.get('notes', ''),
+                user=request.user
+            )
+        except ValidationError as e:
+            return Response(
+                {
+                    "serial_numbers_errors":
+                        e.detail.get("serial_numbers_errors", [])
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = self.get_serializer(job).data
+        data['errors'] = []
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={
+            'Location': request.build_absolute_uri(f'{job.pk}/')
+        })
+
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>\d+)',
+            serializer_class=EquipmentCreateJobSerializer,
+            pagination_class=None, filter_backends=[])
+    def job_detail(self, request, job_id=None, *args, **kwargs):
+        """
+        Progress of a bulk create job with per-index errors ordered by
+        index. Query: errors_after (index) for the next page of errors.
+        """
+        jobs = EquipmentCreateJob.objects.defer('serial_numbers')
+        if not request.user.is_staff:
+            jobs = jobs.filter(created_by_id=request.user.pk)
+        job = jobs.filter(pk=job_id).first()
+        if job is None:
+            raise Http404
+        try:
+            errors_after = int(request.query_params.get('errors_after', -1))
+        except ValueError:
+            raise ValidationError(detail={
+                "errors_after": ["Must be correct index(int)"]
+            })
+
+        data = self.get_serializer(job).data
+        data['errors'] = get_job_errors(job, after=errors_after)
+        return Response(data)
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[CSVStreamParser, NDJSONStreamParser,
+                            MultiPartParser])
+    def import_equipment(self, request, *args, **kwargs):
+        """
+        Streaming bulk import from CSV or NDJSON.
+        Body is either raw text/csv, raw application/x-ndjson or
+        multipart with a "file" field (.csv or .ndjson).
+        Responds with NDJSON: one result per row and a summary line.
+        """
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response(
+                    {'error': 'File is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            lines = upload
+            is_csv = upload.name.lower().endswith('.csv')
+        else:
+            lines = request.data
+            is_csv = request.content_type.startswith(
+                CSVStreamParser.media_type
+            )
+
+        batch_size = settings.EQUIPMENT_IMPORT_BATCH_SIZE
+        try:
+            batch_size = int(request.query_params.get('batch_size',
+                                                      batch_size))
+        except ValueError:
+            pass
+        batch_size = max(
+            1, min(batch_size, settings.EQUIPMENT_IMPORT_MAX_BATCH_SIZE)
+        )
+
+        rows = read_csv_rows(lines) if is_csv else read_ndjson_rows(lines)
+
+        def stream_results():
+            summary = {'created': 0, 'errors': 0}
+            for result in import_equipment_rows(rows, batch_size):
+                if result['status'] == 'created':
+                    summary['created'] += 1
+                else:
+                    summary['errors'] += 1
+                yield json.dumps(result) + '\n'
+            yield json.dumps({'summary': summary}) + '\n'
+
+        return StreamingHttpResponse(
+            stream_results(), content_type='application/x-ndjson'
+        )
 
 
 class UserLoginView(generics.GenericAPIView):
@@ -119,6 +336,7 @@ class UserLoginView(generics.GenericAPIView):
     """
     serializer_class = UserLoginSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -127,7 +345,8 @@ class UserLoginView(generics.GenericAPIView):
         username = serializer.validated_data['username']
         password = serializer.validated_data['password']
 
-        user = authenticate(username=username, password=password)
+        with password_hashing_slot():
+            user = authenticate(username=username, password=password)
 
         if user is None:
             return Response(
@@ -152,6 +371,7 @@ class UserRegisterView(generics.GenericAPIView):
     """
     serializer_class = UserRegisterSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterIPThrottle]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -163,6 +383,8 @@ class UserRegisterView(generics.GenericAPIView):
 
         try:
             user = register_user(username, password, email)
+        except UsernameTakenError as e:
+            raise ValidationError(detail={'username': [str(e)]})
         except ValueError as e:
             return Response(
                 {'error': str(e)},
@@ -178,3 +400,52 @@ class UserRegisterView(generics.GenericAPIView):
             'username': user.username,
             'email': user.email
         }, status=status.HTTP_201_CREATED)
+
+
+class UserLogoutView(generics.GenericAPIView):
+    """
+    Revokes the access token of the request and the given refresh token.
+    Body (optional): {"refresh": "<refresh token>"}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        refresh = request.data.get('refresh') \
+            if isinstance(request.data, dict) else None
+        if refresh:
+            try:
+                refresh_token = RefreshToken(refresh)
+            except TokenError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            revoke_token(refresh_token)
+        if request.auth is not None:
+            revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DatabaseConnectionStatsView(generics.GenericAPIView):
+    """
+    Request and database connection counters of this worker, to check
+    connection reuse and size workers against MySQL max_connections.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(connection_stats.stats())
+
+
+def metrics_view(request):
+    """
+    Request metrics of this worker in Prometheus text format.
+    Requires "Authorization: Bearer <METRICS_TOKEN>".
+    """
+    expected = f'Bearer {settings.METRICS_TOKEN}'.encode()
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(), expected
+    ):
+        raise Http404
+    return HttpResponse(request_metrics.render(),
+                        content_type='text/plain; version=0.0.4')
@@ -11,6 +11,13 @@ sleep 5
 
 echo "MySQL is started"
 
+# SERVER_MODE=worker runs background bulk create jobs, migrations are
+# applied by the web container
+if [ "$SERVER_MODE" = "worker" ]; then
+    cd ./app || true
+    exec python manage.py run_equipment_jobs
+fi
+
 cd ./app || true
 python manage.py makemigrations --noinput
 python manage.py migrate --noinput
@@ -31,4 +38,15 @@ user.save();
 "
 fi
 
-exec gunicorn --bind 0.0.0.0:8000 core.wsgi:application
\ No newline at end of file
+# SERVER_MODE=asgi serves the async endpoints (/api/async/...) natively
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec uvicorn core.asgi:application \
+        --host 0.0.0.0 --port 8000 \
+        --workers "${WEB_CONCURRENCY:-2}"
+fi
+
+# threaded workers: PASSWORD_HASH_CONCURRENCY caps the threads of a worker
+# hashing passwords, the rest keep serving the API
+exec gunicorn --bind 0.0.0.0:8000 \
+    --threads "${GUNICORN_THREADS:-4}" \
+    core.wsgi:application
\ No newline at end of file